@@ -6,17 +6,33 @@ for easy import on your local machine.
 """
 
 import os
-import psycopg2
+import sys
 import json
+import argparse
+import asyncio
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import gzip
 
-def get_db_connection():
-    """Get database connection using environment variables"""
-    database_url = os.environ.get('DATABASE_URL')
-    if not database_url:
-        raise Exception("DATABASE_URL environment variable not set")
-    
-    return psycopg2.connect(database_url)
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# The shared connection module lives with the other Python tooling in server/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+from async_runner import run_in_threads
+from database import close_pool, connect, connection_pool, pooled_connection
+from instrumentation import add_instrumentation_arguments, instrumented_run, stage
+
+# Rows fetched from the server-side cursor and written per INSERT statement
+EXPORT_BATCH_SIZE = 1000
+
+# Rows per id range checksummed by delta exports
+DELTA_BLOCK_SIZE = 1000
+DELTA_DIR = 'deltas'
 
 def escape_sql_string(value):
     """Safely escape SQL string values"""
@@ -32,68 +48,378 @@ def escape_sql_string(value):
         return "'" + value.isoformat() + "'"
     return "'" + str(value).replace("'", "''") + "'"
 
-def export_table_data(cursor, table_name, file_handle):
-    """Export all data from a table as INSERT statements"""
+def export_table_data(conn, table_name, file_handle, batch_size=EXPORT_BATCH_SIZE, where=''):
+    """Export all data from a table as INSERT statements
+
+    Rows are streamed through a named (server-side) cursor and written
+    batch_size at a time, so memory use does not depend on table size.
+    where optionally restricts the rows (e.g. "WHERE id > 10").
+    """
     print(f"Exporting {table_name}...")
     
     # Get table structure
-    cursor.execute(f"""
+    cursor = conn.cursor()
+    cursor.execute("""
         SELECT column_name, data_type 
         FROM information_schema.columns 
-        WHERE table_name = '{table_name}' 
+        WHERE table_name = %s 
         ORDER BY ordinal_position
-    """)
+    """, (table_name,))
     columns = cursor.fetchall()
     column_names = [col[0] for col in columns]
+    cursor.close()
     
-    # Get all data
-    cursor.execute(f"SELECT * FROM {table_name} ORDER BY id")
-    rows = cursor.fetchall()
+    # Stream the data through a server-side cursor
+    data_cursor = conn.cursor(name=f"export_{table_name}")
+    data_cursor.itersize = batch_size
+    data_cursor.execute(f"SELECT * FROM {table_name} {where} ORDER BY id")
     
-    if not rows:
+    row_count = 0
+    try:
+        while True:
+            batch = data_cursor.fetchmany(batch_size)
+            if not batch:
+                break
+            
+            if row_count == 0:
+                file_handle.write(f"-- {table_name.upper()} DATA\n")
+            row_count += len(batch)
+            
+            # Write one multi-row INSERT statement per batch
+            file_handle.write(f"INSERT INTO {table_name} ({', '.join(column_names)}) VALUES\n")
+            file_handle.write(",\n".join(
+                "(" + ", ".join(escape_sql_string(val) for val in row) + ")" for row in batch
+            ))
+            file_handle.write(";\n\n")
+    finally:
+        data_cursor.close()
+    
+    if row_count == 0:
         file_handle.write(f"-- No data found in {table_name}\n\n")
-        return
+        return 0
     
-    file_handle.write(f"-- {table_name.upper()} DATA ({len(rows)} records)\n")
+    file_handle.write(f"-- {table_name.upper()}: {row_count} records\n")
     
-    # Write INSERT statements in batches
-    batch_size = 100
-    for i in range(0, len(rows), batch_size):
-        batch = rows[i:i + batch_size]
-        
-        file_handle.write(f"INSERT INTO {table_name} ({', '.join(column_names)}) VALUES\n")
+    # Update sequence, if the table owns one
+    cursor = conn.cursor()
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (table_name,))
+    sequence = cursor.fetchone()[0]
+    cursor.close()
+    if sequence:
+        file_handle.write(f"SELECT setval('{sequence}', (SELECT MAX(id) FROM {table_name}));\n\n")
+    
+    print(f"✓ Exported {row_count} records from {table_name}")
+    return row_count
+
+def list_tables(cursor):
+    """Names of all tables in the public schema
+    
+    A partitioned flights table is listed once, by its parent name:
+    its year partitions hold the same rows and have no sequence of
+    their own, and leftover flights_yNNNN_load tables from an
+    interrupted year swap are not part of the data.
+    """
+    cursor.execute("""
+        SELECT c.relname
+        FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace
+        WHERE n.nspname = 'public'
+        AND c.relkind IN ('r', 'p')
+        AND NOT c.relispartition
+        AND c.relname !~ '^flights_y[0-9]+_load$'
+        ORDER BY c.relname
+    """)
+    return [row[0] for row in cursor.fetchall()]
+
+def file_sha256(path):
+    """sha256 hex digest of a written export file"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+COMPRESSION_EXTENSIONS = {'none': '', 'gzip': '.gz', 'zstd': '.zst'}
+
+def open_compressed(path, compression):
+    """Open a file for binary writing with the given compression"""
+    if compression == 'gzip':
+        return gzip.open(path, 'wb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise Exception("zstd compression needs the zstandard package")
+        return zstandard.ZstdCompressor().stream_writer(open(path, 'wb'))
+    return open(path, 'wb')
+
+def table_columns(conn, table_name):
+    """Column names of a table in ordinal order"""
+    cursor = conn.cursor()
+    cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = 'public' AND table_name = %s
+        ORDER BY ordinal_position
+    """, (table_name,))
+    columns = [row[0] for row in cursor.fetchall()]
+    cursor.close()
+    return columns
+
+def export_table_binary(conn, table_name, path, compression):
+    """Export a table with PostgreSQL binary COPY, returning its row count
+
+    No per-value Python formatting runs: the server produces the binary
+    stream and it is written (optionally compressed) straight to disk.
+    """
+    print(f"Exporting {table_name} (binary)...")
+    cursor = conn.cursor()
+    with open_compressed(path, compression) as f:
+        cursor.copy_expert(f"COPY (SELECT * FROM {table_name} ORDER BY id) TO STDOUT WITH (FORMAT binary)", f)
+    rows = cursor.rowcount
+    if rows < 0:
+        # Older psycopg2 versions don't report COPY row counts
+        cursor.execute(f"SELECT COUNT(*) FROM {table_name}")
+        rows = cursor.fetchone()[0]
+    cursor.close()
+    print(f"✓ Exported {rows} records from {table_name}")
+    return rows
+
+def export_table_file(snapshot, table_name, output_dir, fmt='sql', compression='none'):
+    """Export one table to its own file inside the exported snapshot"""
+    start = time.perf_counter()
+    with pooled_connection() as conn:
+        conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        cursor = conn.cursor()
+        # Must be the first statement of the transaction
+        cursor.execute("SET TRANSACTION SNAPSHOT %s", (snapshot,))
+        cursor.close()
         
-        for j, row in enumerate(batch):
-            values = [escape_sql_string(val) for val in row]
-            values_str = "(" + ", ".join(values) + ")"
-            
-            if j == len(batch) - 1:  # Last row in batch
-                file_handle.write(f"{values_str};\n")
+        columns = table_columns(conn, table_name)
+        with stage(f"export {table_name}") as counts:
+            if fmt == 'binary':
+                path = os.path.join(output_dir, f"{table_name}.copy{COMPRESSION_EXTENSIONS[compression]}")
+                rows = export_table_binary(conn, table_name, path, compression)
             else:
-                file_handle.write(f"{values_str},\n")
+                path = os.path.join(output_dir, f"{table_name}.sql")
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write(f"-- Wolf's Lair Family Platform - {table_name} export (snapshot {snapshot})\n\n")
+                    rows = export_table_data(conn, table_name, f)
+            counts['rows'] = rows
+            counts['bytes'] = os.path.getsize(path)
+        conn.rollback()
+    
+    return {
+        'table': table_name,
+        'file': os.path.basename(path),
+        'columns': columns,
+        'rows': rows,
+        'bytes': os.path.getsize(path),
+        'sha256': file_sha256(path),
+        'seconds': round(time.perf_counter() - start, 3),
+    }
+
+def export_parallel(workers, output_dir, fmt='sql', compression='none', use_async=False):
+    """Export every table on its own connection from one consistent snapshot
+
+    A coordinating transaction exports its snapshot with pg_export_snapshot()
+    and stays open while worker connections adopt it, so all per-table files
+    reflect the same point in time. A manifest.json lists the files in load
+    order with row counts and checksums. fmt='binary' writes PostgreSQL
+    binary COPY files (compressed with gzip or zstd if asked) for
+    restore_database.py to bulk load. use_async schedules the table exports
+    from an asyncio event loop instead of a thread pool.
+    """
+    start = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    
+    # The coordinator plus one connection per worker
+    connection_pool(workers + 1)
+    with pooled_connection() as coordinator:
+        coordinator.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        cursor = coordinator.cursor()
+        cursor.execute("SELECT pg_export_snapshot()")
+        snapshot = cursor.fetchone()[0]
+        tables = list_tables(cursor)
+        print(f"Exporting {len(tables)} tables from snapshot {snapshot} with {workers} workers")
+        
+        export_one = lambda table: export_table_file(snapshot, table, output_dir, fmt, compression)
+        if use_async:
+            results = asyncio.run(run_in_threads(tables, export_one, workers))
+        else:
+            with ThreadPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(export_one, tables))
+        cursor.close()
+    close_pool()
+    
+    manifest = {
+        'generated_on': datetime.now().isoformat(),
+        'snapshot': snapshot,
+        'format': fmt,
+        'compression': compression if fmt == 'binary' else 'none',
+        'tables': results,
+    }
+    with open(os.path.join(output_dir, 'manifest.json'), 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    
+    print("\n" + "="*50)
+    print("PARALLEL DATABASE EXPORT COMPLETE")
+    print("="*50)
+    for result in results:
+        print(f"  {result['table']}: {result['rows']:,} records in {result['seconds']:.2f}s")
+    print(f"\nOutput directory: {output_dir}")
+    print(f"Total time: {time.perf_counter() - start:.2f}s")
+    return 0
+
+def table_blocks(conn, table_name, block_size=DELTA_BLOCK_SIZE):
+    """Checksum and max id of every id range of a table, keyed by block number"""
+    cursor = conn.cursor()
+    cursor.execute(f"""
+        SELECT id / {block_size}, md5(string_agg(md5(t::text), '' ORDER BY id)), MAX(id)
+        FROM {table_name} t
+        GROUP BY 1
+    """)
+    blocks = {str(block): {'md5': checksum, 'max_id': max_id}
+              for block, checksum, max_id in cursor.fetchall()}
+    cursor.close()
+    return blocks
+
+def read_delta_manifest(delta_dir):
+    """The delta chain manifest, or an empty chain before the first delta"""
+    path = os.path.join(delta_dir, 'manifest.json')
+    if not os.path.exists(path):
+        return {'block_size': DELTA_BLOCK_SIZE, 'tables': {}, 'deltas': []}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def write_delta_manifest(delta_dir, manifest):
+    """Replace the delta chain manifest atomically"""
+    path = os.path.join(delta_dir, 'manifest.json')
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2)
+    os.replace(path + '.tmp', path)
+
+def export_delta(output_dir):
+    """Export only the rows changed since the previous delta
+
+    Each table's high-water state is a checksum per id range of
+    DELTA_BLOCK_SIZE rows plus the max id seen. Ranges whose checksum
+    changed, or that are new or gone, are written as a DELETE of the range
+    followed by INSERTs of its current rows; for append-only tables such
+    as flights that is just the range around the previous max id. The
+    first delta contains every row, so the chain alone rebuilds the data.
+    Deltas are numbered and each records the checksum of the one before
+    it for restore_database.py --deltas to apply in order.
+    """
+    start = time.perf_counter()
+    delta_dir = os.path.join(output_dir, DELTA_DIR)
+    os.makedirs(delta_dir, exist_ok=True)
+    manifest = read_delta_manifest(delta_dir)
+    block_size = manifest['block_size']
+    sequence = len(manifest['deltas']) + 1
+    previous = manifest['deltas'][-1]['sha256'] if manifest['deltas'] else None
+    
+    conn = connect()
+    try:
+        conn.set_session(isolation_level='REPEATABLE READ', readonly=True)
+        cursor = conn.cursor()
+        tables = list_tables(cursor)
+        cursor.close()
         
-        file_handle.write("\n")
+        marks = {}
+        changes = {}
+        for table in tables:
+            blocks = table_blocks(conn, table, block_size)
+            old_blocks = manifest['tables'].get(table, {}).get('blocks', {})
+            changed = sorted(int(block) for block, mark in blocks.items()
+                             if old_blocks.get(block, {}).get('md5') != mark['md5'])
+            removed = sorted(int(block) for block in old_blocks if block not in blocks)
+            marks[table] = {
+                'max_id': max((mark['max_id'] for mark in blocks.values()), default=None),
+                'blocks': blocks,
+            }
+            if changed or removed:
+                changes[table] = (changed, removed)
+        
+        if not changes:
+            print(f"No changes since delta {sequence - 1}")
+            conn.rollback()
+            return 0
+        
+        path = os.path.join(delta_dir, f"{sequence:05d}.sql")
+        results = {}
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(f"-- Wolf's Lair Family Platform - Delta export {sequence}\n")
+            f.write(f"-- Generated on: {datetime.now().isoformat()}\n")
+            f.write(f"-- Previous delta: {previous or 'none'}\n\n")
+            for table, (changed, removed) in changes.items():
+                touched = ', '.join(str(block) for block in sorted(changed + removed))
+                f.write(f"DELETE FROM {table} WHERE id / {block_size} IN ({touched});\n\n")
+                rows = 0
+                if changed:
+                    blocks = ', '.join(str(block) for block in changed)
+                    rows = export_table_data(conn, table, f, where=f"WHERE id / {block_size} IN ({blocks})")
+                results[table] = {'blocks': len(changed) + len(removed), 'rows': rows}
+        conn.rollback()
+    finally:
+        conn.close()
     
-    # Update sequence
-    file_handle.write(f"SELECT setval('{table_name}_id_seq', (SELECT MAX(id) FROM {table_name}));\n\n")
+    manifest['tables'] = marks
+    manifest['deltas'].append({
+        'sequence': sequence,
+        'file': os.path.basename(path),
+        'generated_on': datetime.now().isoformat(),
+        'previous_sha256': previous,
+        'sha256': file_sha256(path),
+        'tables': results,
+    })
+    write_delta_manifest(delta_dir, manifest)
     
-    print(f"✓ Exported {len(rows)} records from {table_name}")
+    print("\n" + "="*50)
+    print(f"DELTA EXPORT {sequence} COMPLETE")
+    print("="*50)
+    for table, result in results.items():
+        print(f"  {table}: {result['rows']:,} records from {result['blocks']} changed id ranges")
+    print(f"\nOutput file: {path}")
+    print(f"Total time: {time.perf_counter() - start:.2f}s")
+    return 0
 
 def main():
+    parser = argparse.ArgumentParser(description="Export the complete database")
+    parser.add_argument('--parallel', type=int, metavar='WORKERS',
+                        help="export each table on its own connection from one snapshot")
+    parser.add_argument('--output-dir', default='database_export',
+                        help="directory for per-table files in parallel mode")
+    parser.add_argument('--format', choices=['sql', 'binary'], default='sql',
+                        help="binary writes per-table PostgreSQL binary COPY files (implies a directory export)")
+    parser.add_argument('--compress', choices=sorted(COMPRESSION_EXTENSIONS), default='none',
+                        help="compression for binary COPY files")
+    parser.add_argument('--delta', action='store_true',
+                        help="export only rows changed since the last delta into OUTPUT_DIR/deltas")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="run the per-table exports from an asyncio event loop (implies a directory export)")
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+    
+    with instrumented_run('export_complete_database', args) as run:
+        status = export_database(args)
+        if status:
+            run.status = 'failed'
+    return status
+
+def export_database(args):
+    """Run the export selected by the command line, returning the exit status"""
     try:
+        if args.delta:
+            return export_delta(args.output_dir)
+        
+        if args.parallel or args.format == 'binary' or args.use_async:
+            return export_parallel(args.parallel or 1, args.output_dir, args.format, args.compress,
+                                   use_async=args.use_async)
+        
         # Connect to database
-        conn = get_db_connection()
+        conn = connect()
         cursor = conn.cursor()
         
         # Get all tables
-        cursor.execute("""
-            SELECT table_name 
-            FROM information_schema.tables 
-            WHERE table_schema = 'public' 
-            AND table_type = 'BASE TABLE'
-            ORDER BY table_name
-        """)
-        tables = [row[0] for row in cursor.fetchall()]
+        tables = list_tables(cursor)
         
         print(f"Found {len(tables)} tables: {', '.join(tables)}")
         
@@ -112,9 +438,13 @@ def main():
             # Export each table
             for table in tables:
                 try:
-                    export_table_data(cursor, table, f)
+                    with stage(f"export {table}") as counts:
+                        offset = f.tell()
+                        counts['rows'] = export_table_data(conn, table, f)
+                        counts['bytes'] = f.tell() - offset
                 except Exception as e:
                     print(f"Error exporting {table}: {e}")
+                    conn.rollback()
                     f.write(f"-- Error exporting {table}: {e}\n\n")
             
             f.write("-- Commit transaction\n")
@@ -161,6 +491,7 @@ def main():
         conn.close()
         
         print("\n✅ Export successful! Use complete_database_dump.sql for your local setup.")
+        return 0
         
     except Exception as e:
         print(f"❌ Export failed: {e}")
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Wolf's Lair Family Platform - Database Restore Script
+Loads a database export back in with COPY instead of replaying INSERTs:
+
+- a single-file SQL dump such as complete_database_dump.sql
+- a per-table export directory written by export_complete_database.py
+  (--parallel, in either sql or binary format)
+- the delta chain written by export_complete_database.py --delta,
+  applied in order on top of the restored data
+
+Secondary indexes and foreign keys on the restored tables are dropped
+for the load and rebuilt afterwards, and sequences are reset once at the
+end. Everything runs in one transaction. Year partitions of a
+partitioned flights table (and leftover flights_yNNNN_load tables) in
+exports written before they were excluded are skipped, since their rows
+are restored through flights itself.
+
+Usage:
+    python restore_database.py complete_database_dump.sql
+    python restore_database.py database_export/
+    python restore_database.py --deltas database_export/deltas --since 12
+"""
+
+import os
+import re
+import io
+import sys
+import json
+import gzip
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+from database import connect
+from export_complete_database import zstandard, file_sha256, list_tables, read_delta_manifest
+
+# Rows buffered per COPY when replaying a SQL dump
+COPY_FLUSH_BYTES = 8 << 20
+
+INSERT_PATTERN = re.compile(r"INSERT INTO\s+(\w+)\s*\(([^)]*)\)\s*VALUES\s*", re.IGNORECASE)
+VALUE_PATTERN = re.compile(r"'([^']*(?:''[^']*)*)'|([^,()\s;]+)|([()])")
+DELETE_PATTERN = re.compile(r"DELETE FROM\s+(\w+)", re.IGNORECASE)
+SETVAL_PATTERN = re.compile(r"SELECT\s+setval\(", re.IGNORECASE)
+TABLE_PATTERN = re.compile(r"^(?:INSERT INTO\s+(\w+)|-- No data found in (\w+)|-- No (\w+) data to import)",
+                           re.IGNORECASE)
+
+def open_decompressed(path, compression):
+    """Open an export file for binary reading with the given compression"""
+    if compression == 'gzip':
+        return gzip.open(path, 'rb')
+    if compression == 'zstd':
+        if zstandard is None:
+            raise Exception("zstd-compressed exports need the zstandard package")
+        return zstandard.ZstdDecompressor().stream_reader(open(path, 'rb'), closefd=True)
+    return open(path, 'rb')
+
+def read_manifest(export_dir):
+    """Load the manifest.json written next to the per-table files"""
+    with open(os.path.join(export_dir, 'manifest.json'), encoding='utf-8') as f:
+        return json.load(f)
+
+def quote_ident(name):
+    """Quote a column name so camelCase and reserved words (from, to, order) survive"""
+    return '"' + name.replace('"', '""') + '"'
+
+def reset_sequence(cursor, table_name):
+    """Point a table's id sequence past the restored rows"""
+    cursor.execute("SELECT pg_get_serial_sequence(%s, 'id')", (table_name,))
+    sequence = cursor.fetchone()[0]
+    if sequence:
+        cursor.execute(f"SELECT setval(%s, COALESCE((SELECT MAX(id) FROM {table_name}), 0) + 1, false)",
+                       (sequence,))
+
+def restorable_tables(cursor, tables):
+    """The tables to restore, dropping year partitions and other tables list_tables excludes"""
+    existing = set(list_tables(cursor))
+    skipped = [table for table in tables if table not in existing]
+    if skipped:
+        print(f"Skipping {', '.join(skipped)} (partitions or tables not in this database)")
+    return [table for table in tables if table in existing]
+
+def drop_foreign_keys(cursor, tables):
+    """Drop the foreign keys on the tables, returning the DDL to add them back"""
+    cursor.execute("""
+        SELECT c.conrelid::regclass::text, c.conname, pg_get_constraintdef(c.oid)
+        FROM pg_constraint c
+        WHERE c.contype = 'f' AND c.conrelid::regclass::text = ANY(%s)
+    """, (list(tables),))
+    foreign_keys = cursor.fetchall()
+    for table, name, _ in foreign_keys:
+        cursor.execute(f"ALTER TABLE {table} DROP CONSTRAINT {quote_ident(name)}")
+    return [f"ALTER TABLE {table} ADD CONSTRAINT {quote_ident(name)} {definition}"
+            for table, name, definition in foreign_keys]
+
+def drop_deferred_objects(cursor, tables):
+    """Drop secondary indexes and foreign keys on the tables, returning the DDL to rebuild them
+
+    Primary keys and unique constraints stay in place so duplicate rows
+    in a dump still fail the restore.
+    """
+    foreign_keys = drop_foreign_keys(cursor, tables)
+
+    cursor.execute("""
+        SELECT i.indexname, i.indexdef
+        FROM pg_indexes i
+        WHERE i.schemaname = 'public' AND i.tablename = ANY(%s)
+        AND NOT EXISTS (
+            SELECT 1 FROM pg_constraint c
+            WHERE c.conindid = format('%%I.%%I', i.schemaname, i.indexname)::regclass
+        )
+    """, (list(tables),))
+    indexes = cursor.fetchall()
+    for name, _ in indexes:
+        cursor.execute(f"DROP INDEX {quote_ident(name)}")
+
+    print(f"Deferred {len(indexes)} indexes and {len(foreign_keys)} foreign keys")
+    return [definition for _, definition in indexes] + foreign_keys
+
+def rebuild_deferred_objects(cursor, statements):
+    """Recreate the indexes and foreign keys dropped for the load"""
+    start = time.perf_counter()
+    for statement in statements:
+        cursor.execute(statement)
+    print(f"✓ Rebuilt {len(statements)} indexes and constraints in {time.perf_counter() - start:.2f}s")
+
+def iter_statements(lines):
+    """Split a SQL dump into statements, skipping comments between them
+
+    A statement ends at a line ending in ';' outside a string literal.
+    Quote parity per line is enough to track literals because an escaped
+    quote ('') never changes it.
+    """
+    statement = []
+    in_string = False
+    for line in lines:
+        if not statement and (line.startswith('--') or not line.strip()):
+            continue
+        statement.append(line)
+        if line.count("'") % 2:
+            in_string = not in_string
+        if not in_string and line.rstrip().endswith(';'):
+            yield ''.join(statement)
+            statement = []
+    if statement:
+        yield ''.join(statement)
+
+def copy_text_value(quoted, bare):
+    """COPY text representation of one dump literal"""
+    if quoted is not None:
+        return (quoted.replace("''", "'")
+                      .replace('\\', '\\\\')
+                      .replace('\t', '\\t')
+                      .replace('\n', '\\n')
+                      .replace('\r', '\\r'))
+    if bare.upper() == 'NULL':
+        return '\\N'
+    return bare
+
+def parse_insert(statement):
+    """Table, columns and COPY text lines of a multi-row INSERT ... VALUES statement
+
+    Returns None for statements that are not INSERTs.
+    """
+    match = INSERT_PATTERN.match(statement)
+    if not match:
+        return None
+    table = match.group(1)
+    columns = [column.strip().strip('"') for column in match.group(2).split(',')]
+
+    lines = []
+    row = None
+    for quoted, bare, paren in VALUE_PATTERN.findall(statement, match.end()):
+        if paren == '(':
+            row = []
+        elif paren == ')':
+            lines.append('\t'.join(row) + '\n')
+            row = None
+        elif row is not None:
+            # findall reports unmatched groups as '', so an empty literal has no bare token
+            row.append(copy_text_value(None if bare else quoted, bare))
+    return table, columns, lines
+
+def dump_tables(path):
+    """Tables a SQL dump restores, in dump order, including ones it records as empty"""
+    tables = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            match = TABLE_PATTERN.match(line)
+            if match:
+                table = next(group for group in match.groups() if group)
+                if table not in tables:
+                    tables.append(table)
+    return tables
+
+def restore_sql_files(cursor, paths, tables=None):
+    """COPY the rows of the INSERT statements in SQL dump files, with per-table progress
+
+    Consecutive INSERT batches for the same table share one COPY buffer,
+    flushed when the table changes or the buffer reaches COPY_FLUSH_BYTES.
+    Other statements (BEGIN/COMMIT, setval) are skipped; sequences are reset
+    once all tables are loaded. INSERTs into tables outside tables, when
+    given, are skipped too.
+    """
+    totals = {}
+    current = {'table': None, 'columns': None, 'buffer': io.StringIO(), 'rows': 0, 'start': 0.0}
+
+    def flush():
+        if current['rows']:
+            current['buffer'].seek(0)
+            cursor.copy_expert(
+                f"COPY {current['table']} ({', '.join(quote_ident(c) for c in current['columns'])}) FROM STDIN",
+                current['buffer']
+            )
+            totals[current['table']] = totals.get(current['table'], 0) + current['rows']
+        current['buffer'] = io.StringIO()
+        current['rows'] = 0
+
+    def finish_table():
+        flush()
+        if current['table']:
+            print(f"✓ Restored {totals.get(current['table'], 0):,} records into {current['table']} "
+                  f"in {time.perf_counter() - current['start']:.2f}s")
+
+    for path in paths:
+        with open(path, encoding='utf-8') as f:
+            for statement in iter_statements(f):
+                parsed = parse_insert(statement)
+                if parsed is None:
+                    continue
+                table, columns, lines = parsed
+                if tables is not None and table not in tables:
+                    continue
+                if table != current['table'] or columns != current['columns']:
+                    if table != current['table']:
+                        finish_table()
+                        current['start'] = time.perf_counter()
+                    else:
+                        flush()
+                    current['table'] = table
+                    current['columns'] = columns
+                current['buffer'].writelines(lines)
+                current['rows'] += len(lines)
+                if current['buffer'].tell() >= COPY_FLUSH_BYTES:
+                    flush()
+    finish_table()
+    return totals
+
+def restore_sql_dump(conn, paths, tables):
+    """Truncate the tables and restore SQL dump files with deferred indexes in one transaction"""
+    cursor = conn.cursor()
+    tables = restorable_tables(cursor, tables)
+    cursor.execute(f"TRUNCATE {', '.join(tables)} CASCADE")
+    rebuild = drop_deferred_objects(cursor, tables)
+
+    restore_sql_files(cursor, paths, tables)
+
+    rebuild_deferred_objects(cursor, rebuild)
+    for table in tables:
+        reset_sequence(cursor, table)
+    conn.commit()
+    cursor.close()
+
+def restore_binary_export(conn, export_dir, manifest):
+    """Truncate the exported tables and COPY every binary file back in one transaction"""
+    compression = manifest.get('compression', 'none')
+    cursor = conn.cursor()
+    restorable = restorable_tables(cursor, [entry['table'] for entry in manifest['tables']])
+    tables = [entry for entry in manifest['tables'] if entry['table'] in restorable]
+
+    cursor.execute(f"TRUNCATE {', '.join(entry['table'] for entry in tables)} CASCADE")
+    rebuild = drop_deferred_objects(cursor, [entry['table'] for entry in tables])
+
+    for entry in tables:
+        start = time.perf_counter()
+        path = os.path.join(export_dir, entry['file'])
+        with open_decompressed(path, compression) as f:
+            cursor.copy_expert(
+                f"COPY {entry['table']} ({', '.join(quote_ident(c) for c in entry['columns'])}) "
+                f"FROM STDIN WITH (FORMAT binary)",
+                f
+            )
+        print(f"✓ Restored {entry['rows']:,} records into {entry['table']} "
+              f"in {time.perf_counter() - start:.2f}s")
+
+    rebuild_deferred_objects(cursor, rebuild)
+    for entry in tables:
+        reset_sequence(cursor, entry['table'])
+    conn.commit()
+    cursor.close()
+
+def verify_delta_chain(delta_dir, deltas):
+    """Check that deltas are numbered consecutively, unmodified and linked to their predecessor"""
+    previous = None
+    for expected, delta in enumerate(deltas, start=1):
+        if delta['sequence'] != expected:
+            raise Exception(f"Delta chain has a gap: expected {expected}, found {delta['sequence']}")
+        if delta['previous_sha256'] != previous:
+            raise Exception(f"Delta {expected} does not follow delta {expected - 1}")
+        if file_sha256(os.path.join(delta_dir, delta['file'])) != delta['sha256']:
+            raise Exception(f"Delta {expected} ({delta['file']}) has been modified")
+        previous = delta['sha256']
+
+def apply_delta(cursor, path, tables):
+    """Replay one delta file: INSERT batches go through COPY and DELETEs run as-is
+
+    Statements for tables outside tables (year partitions in deltas
+    written before they were excluded) are skipped, as are the setval
+    statements; the sequences of the tables inserted into are reset
+    instead.
+    """
+    rows = 0
+    inserted = []
+    with open(path, encoding='utf-8') as f:
+        for statement in iter_statements(f):
+            parsed = parse_insert(statement)
+            if parsed is None:
+                delete = DELETE_PATTERN.match(statement)
+                if delete and delete.group(1) not in tables:
+                    continue
+                if not SETVAL_PATTERN.match(statement):
+                    cursor.execute(statement)
+                continue
+            table, columns, lines = parsed
+            if table not in tables:
+                continue
+            cursor.copy_expert(
+                f"COPY {table} ({', '.join(quote_ident(c) for c in columns)}) FROM STDIN",
+                io.StringIO(''.join(lines))
+            )
+            rows += len(lines)
+            if table not in inserted:
+                inserted.append(table)
+    for table in inserted:
+        reset_sequence(cursor, table)
+    return rows
+
+def apply_deltas(conn, delta_dir, since=0):
+    """Apply the delta chain after sequence number since, committing each delta
+
+    A delta deletes and re-inserts whole id ranges table by table, so a
+    parent row (a family member) can be deleted while its children
+    (posts) still point at it. Foreign keys are dropped for each delta
+    and added back before its commit, which checks the result instead
+    of every intermediate statement.
+    """
+    deltas = read_delta_manifest(delta_dir)['deltas']
+    verify_delta_chain(delta_dir, deltas)
+    pending = [delta for delta in deltas if delta['sequence'] > since]
+    print(f"Applying {len(pending)} of {len(deltas)} deltas")
+
+    cursor = conn.cursor()
+    tables = set(list_tables(cursor))
+    for delta in pending:
+        start = time.perf_counter()
+        foreign_keys = drop_foreign_keys(cursor, tables)
+        rows = apply_delta(cursor, os.path.join(delta_dir, delta['file']), tables)
+        rebuild_deferred_objects(cursor, foreign_keys)
+        conn.commit()
+        print(f"✓ Applied delta {delta['sequence']} ({rows:,} records) "
+              f"in {time.perf_counter() - start:.2f}s")
+    cursor.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Restore a database export")
+    parser.add_argument('source', nargs='?',
+                        help="SQL dump file, or directory written by export_complete_database.py --parallel")
+    parser.add_argument('--deltas', metavar='DELTA_DIR',
+                        help="apply the delta chain in this directory after restoring SOURCE")
+    parser.add_argument('--since', type=int, default=0,
+                        help="skip deltas up to and including this sequence number")
+    args = parser.parse_args()
+    if not args.source and not args.deltas:
+        parser.error("nothing to restore: give a SOURCE and/or --deltas")
+
+    try:
+        start = time.perf_counter()
+        conn = connect()
+        try:
+            if args.source and os.path.isdir(args.source):
+                manifest = read_manifest(args.source)
+                if manifest.get('format') == 'binary':
+                    restore_binary_export(conn, args.source, manifest)
+                else:
+                    tables = [entry['table'] for entry in manifest['tables']]
+                    paths = [os.path.join(args.source, entry['file']) for entry in manifest['tables']]
+                    restore_sql_dump(conn, paths, tables)
+            elif args.source:
+                restore_sql_dump(conn, [args.source], dump_tables(args.source))
+            if args.deltas:
+                apply_deltas(conn, args.deltas, args.since)
+        finally:
+            conn.close()
+
+        print(f"\n✅ Restore complete in {time.perf_counter() - start:.2f}s")
+        return 0
+
+    except Exception as e:
+        print(f"❌ Restore failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
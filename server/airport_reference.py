@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+"""
+Single source of truth for airport reference data.
+
+data/airports.csv (ICAO, IATA, name, city, country, lat/lon) is the
+editable source. On first use it is compiled into data/airports.npz,
+which holds the columns as NumPy arrays and loads in a few milliseconds
+even for a worldwide list; the compiled file is rebuilt whenever the CSV
+is newer. The index is built once per process and serves lookups by ICAO
+or IATA code in constant time.
+"""
+import csv
+import os
+
+import numpy as np
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+REFERENCE_CSV = os.path.join(DATA_DIR, 'airports.csv')
+COMPILED_NPZ = os.path.join(DATA_DIR, 'airports.npz')
+
+TEXT_FIELDS = ['icao', 'iata', 'name', 'city', 'country']
+
+class AirportIndex:
+    """Column arrays of the reference airports plus a code -> row index"""
+
+    def __init__(self, icao, iata, name, city, country, latitude, longitude):
+        self.icao = icao
+        self.iata = iata
+        self.name = name
+        self.city = city
+        self.country = country
+        self.latitude = latitude
+        self.longitude = longitude
+        self.positions = {code: i for i, code in enumerate(iata) if code}
+        # ICAO codes win over an IATA code that happens to collide
+        self.positions.update((code, i) for i, code in enumerate(icao))
+
+    def __len__(self):
+        return len(self.icao)
+
+    def __contains__(self, code):
+        return code in self.positions
+
+    def get(self, code):
+        """Reference entry for an ICAO or IATA code as a dict, or None"""
+        i = self.positions.get(code)
+        if i is None:
+            return None
+        return {
+            'icao': str(self.icao[i]),
+            'iata': str(self.iata[i]) or None,
+            'name': str(self.name[i]),
+            'city': str(self.city[i]) or None,
+            'country': str(self.country[i]) or None,
+            'lat': float(self.latitude[i]),
+            'lng': float(self.longitude[i]),
+        }
+
+    def record(self, code, default_city='Unknown', default_country='Unknown'):
+        """airports row (code, name, city, country, latitude, longitude) for the bulk loader
+
+        Unknown codes get a placeholder name and no coordinates.
+        """
+        entry = self.get(code)
+        if entry is None:
+            return (code, f'Airport {code}', default_city, default_country, None, None)
+        return (
+            code,
+            entry['name'],
+            entry['city'] or default_city,
+            entry['country'] or default_country,
+            entry['lat'],
+            entry['lng'],
+        )
+
+    def records(self):
+        """airports rows for every reference airport, keyed by ICAO code"""
+        for i in range(len(self.icao)):
+            yield (
+                str(self.icao[i]),
+                str(self.name[i]),
+                str(self.city[i]) or None,
+                str(self.country[i]) or None,
+                float(self.latitude[i]),
+                float(self.longitude[i]),
+            )
+
+    def positions_of(self, codes):
+        """Row index for each code, -1 where the code is unknown"""
+        positions = self.positions
+        return np.fromiter((positions.get(code, -1) for code in codes), dtype=np.int64)
+
+    def coordinates(self, codes):
+        """Latitude and longitude arrays for a sequence of codes (NaN where unknown)"""
+        index = self.positions_of(codes)
+        known = index >= 0
+        latitude = np.full(len(index), np.nan)
+        longitude = np.full(len(index), np.nan)
+        latitude[known] = self.latitude[index[known]]
+        longitude[known] = self.longitude[index[known]]
+        return latitude, longitude
+
+def read_reference_csv(path=REFERENCE_CSV):
+    """Parse the reference CSV into column arrays"""
+    columns = {field: [] for field in TEXT_FIELDS}
+    latitude = []
+    longitude = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            code = row['icao'].strip().upper()
+            if not code:
+                continue
+            columns['icao'].append(code)
+            columns['iata'].append(row.get('iata', '').strip().upper())
+            for field in ('name', 'city', 'country'):
+                columns[field].append(row.get(field, '').strip())
+            latitude.append(float(row['latitude']))
+            longitude.append(float(row['longitude']))
+
+    arrays = {field: np.array(values, dtype=str) for field, values in columns.items()}
+    arrays['latitude'] = np.array(latitude, dtype=np.float64)
+    arrays['longitude'] = np.array(longitude, dtype=np.float64)
+    return arrays
+
+def compile_reference(csv_path=REFERENCE_CSV, npz_path=COMPILED_NPZ):
+    """Compile the reference CSV into the binary .npz form and return its arrays"""
+    arrays = read_reference_csv(csv_path)
+    tmp_path = npz_path + '.tmp.npz'
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, npz_path)
+    return arrays
+
+def load_arrays(csv_path=REFERENCE_CSV, npz_path=COMPILED_NPZ):
+    """Load the compiled arrays, recompiling when the CSV has changed"""
+    if (os.path.exists(npz_path)
+            and os.path.getmtime(npz_path) >= os.path.getmtime(csv_path)):
+        with np.load(npz_path) as data:
+            return {name: data[name] for name in data.files}
+    try:
+        return compile_reference(csv_path, npz_path)
+    except OSError:
+        # Read-only checkout: fall back to parsing the CSV every time
+        return read_reference_csv(csv_path)
+
+_index = None
+
+def airport_index():
+    """The process-wide airport index, built on first use"""
+    global _index
+    if _index is None:
+        _index = AirportIndex(**load_arrays())
+    return _index
+
+def lookup(code):
+    """Reference entry for an airport code, or None"""
+    return airport_index().get(code)
+
+def airport_record(code):
+    """airports row for the bulk loader, with reference data when the code is known"""
+    return airport_index().record(code)
@@ -0,0 +1,68 @@
+#!/usr/bin/env python3
+"""
+asyncio driver for the import and export pipelines.
+
+Workbook parsing and cleaning is CPU-bound and runs in a process pool;
+database writes and COPY streams block on the network and run in threads
+(asyncio.to_thread) on pooled connections from database.py, since
+psycopg2 has no native asyncio support. The event loop keeps both in
+flight at once, and a bounded asyncio.Queue between them applies
+back-pressure so parsed files never pile up faster than they are loaded.
+"""
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+
+async def parse_and_load(items, parse, load, parsers, loaders, queue_size):
+    """Run parse(item) in a process pool and load(item, parsed) in threads, overlapping both
+
+    Returns the load results as (item, result) pairs in completion order
+    and the failures as (item, exception) pairs. A parser holds its slot
+    until the queue accepts its result, so at most parsers + queue_size
+    parsed items are held in memory.
+    """
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue(maxsize=queue_size)
+    slots = asyncio.Semaphore(parsers)
+    loaded = []
+    failures = []
+
+    async def produce(executor, item):
+        async with slots:
+            try:
+                parsed = await loop.run_in_executor(executor, parse, item)
+            except Exception as e:
+                print(f"Error parsing {item}: {e}")
+                failures.append((item, e))
+                return
+            await queue.put((item, parsed))
+
+    async def consume():
+        while True:
+            entry = await queue.get()
+            if entry is None:
+                return
+            item, parsed = entry
+            try:
+                loaded.append((item, await asyncio.to_thread(load, item, parsed)))
+            except Exception as e:
+                print(f"Error loading {item}: {e}")
+                failures.append((item, e))
+
+    with ProcessPoolExecutor(max_workers=parsers) as executor:
+        consumers = [asyncio.create_task(consume()) for _ in range(loaders)]
+        await asyncio.gather(*(produce(executor, item) for item in items))
+        for _ in consumers:
+            await queue.put(None)
+        await asyncio.gather(*consumers)
+
+    return loaded, failures
+
+async def run_in_threads(items, func, limit):
+    """Run blocking func(item) for every item with at most limit in flight, preserving order"""
+    slots = asyncio.Semaphore(limit)
+
+    async def run(item):
+        async with slots:
+            return await asyncio.to_thread(func, item)
+
+    return await asyncio.gather(*(run(item) for item in items))
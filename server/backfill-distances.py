@@ -0,0 +1,111 @@
+#!/usr/bin/env python3
+"""
+Backfill or validate flights.distance from great-circle distances.
+
+Reads every flight's route once, computes all distances in one NumPy
+pass from the airport reference (falling back to coordinates stored in
+the airports table), and writes the results back with a COPY into a temp
+table plus a single UPDATE ... FROM. Usage:
+
+    python backfill-distances.py              # fill missing distances
+    python backfill-distances.py --overwrite  # also correct logged distances within tolerance
+    python backfill-distances.py --validate   # only report disagreements
+
+Logged distances that disagree with the great circle by more than the
+tolerance (great_circle.MISMATCH_NM and MISMATCH_RATIO) are never
+overwritten; they are listed for a human to check instead.
+"""
+import argparse
+import sys
+
+import numpy as np
+
+from bulk_load import copy_rows
+from database import connect_to_db
+from flight_shards import print_shard_stats, write_flight_shards
+from flight_stats import print_stats_refresh, refresh_flight_stats
+from great_circle import distance_mismatches, haversine_nm, resolve_coordinates, table_coordinates
+
+def print_mismatches(ids, from_codes, to_codes, logged, computed, mismatched, limit=20):
+    """List the first flights whose logged distance disagrees with the great circle"""
+    for i in np.flatnonzero(mismatched)[:limit]:
+        print(f"  flight {ids[i]} {from_codes[i]}-{to_codes[i]}: "
+              f"logged {logged[i]:.0f} nm, great circle {computed[i]:.0f} nm")
+
+def backfill_distances(overwrite=False, validate=False):
+    """Compute great-circle distances for all flights and store or report them"""
+    conn = connect_to_db()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+
+        stored = table_coordinates(cursor)
+
+        cursor.execute("SELECT id, from_airport, to_airport, distance FROM flights")
+        rows = cursor.fetchall()
+        print(f"Read {len(rows)} flights")
+        if not rows:
+            return True
+
+        ids, from_codes, to_codes, logged = zip(*rows)
+        ids = np.array(ids)
+        logged = np.array([np.nan if value is None else value for value in logged], dtype=np.float64)
+
+        from_lat, from_lon = resolve_coordinates(from_codes, stored)
+        to_lat, to_lon = resolve_coordinates(to_codes, stored)
+        computed = haversine_nm(from_lat, from_lon, to_lat, to_lon)
+
+        resolved = ~np.isnan(computed)
+        mismatched = distance_mismatches(logged, computed)
+        print(f"{int(resolved.sum())} routes resolved, {int((~resolved).sum())} without coordinates")
+        print(f"{int(mismatched.sum())} logged distances disagree with the great circle")
+
+        if validate:
+            print_mismatches(ids, from_codes, to_codes, logged, computed, mismatched)
+            return True
+
+        if overwrite:
+            write = resolved & ~mismatched
+            if mismatched.any():
+                print("Keeping these logged distances, which are outside the overwrite tolerance:")
+                print_mismatches(ids, from_codes, to_codes, logged, computed, mismatched)
+        else:
+            write = resolved & np.isnan(logged)
+
+        cursor.execute("""
+            CREATE TEMP TABLE flight_distances (id integer PRIMARY KEY, distance real)
+            ON COMMIT DROP
+        """)
+        copy_rows(cursor, 'flight_distances', ['id', 'distance'],
+                  zip(ids[write].tolist(), np.round(computed[write], 1).tolist()))
+        cursor.execute("""
+            UPDATE flights f SET distance = d.distance
+            FROM flight_distances d
+            WHERE f.id = d.id AND f.distance IS DISTINCT FROM d.distance
+        """)
+        updated = cursor.rowcount
+        conn.commit()
+        print(f"Updated distance on {updated} flights")
+        if updated:
+            print_stats_refresh(refresh_flight_stats(conn))
+            print_shard_stats(write_flight_shards(conn))
+        return True
+
+    except Exception as e:
+        print(f"Error backfilling distances: {e}")
+        return False
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Backfill flights.distance from great-circle distances")
+    parser.add_argument('--overwrite', action='store_true',
+                        help="also replace logged distances within tolerance of the great circle")
+    parser.add_argument('--validate', action='store_true',
+                        help="report disagreements without writing anything")
+    args = parser.parse_args()
+
+    success = backfill_distances(overwrite=args.overwrite, validate=args.validate)
+    sys.exit(0 if success else 1)
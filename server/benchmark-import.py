@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Import benchmark over synthetic logbooks.
+
+Generates (once, then reuses) synthetic logbooks of each requested size
+and runs every importer variant against a throwaway PostgreSQL database.
+Each run is an instrumented_run(), so the stages are the ones the
+production jobs record (read, clean, resolve, load, merge, ...) with their
+wall and CPU time, rows, bytes and, with --trace-memory, traced memory.
+Tables live in a scratch schema that is dropped afterwards. Stage wall
+times are printed as a table and every stage measurement is saved in a
+JSON report; --compare flags stages that got slower than a previous
+report. Usage:
+
+    python benchmark-import.py --database-url postgresql://localhost/bench_scratch
+    python benchmark-import.py --sizes 1000 10000 100000 1000000 --variants whole-sheet stream
+    python benchmark-import.py --compare .benchmark-data/report-20250101-120000.json
+
+Variants mirror the importers: whole-sheet (batch-import.py,
+optimized-flight-import.py and the other full-sheet importers), cached
+(the same with a warm logbook cache), stream (optimized-flight-import.py
+--stream) and incremental (re-running optimized-flight-import.py
+--incremental over an unchanged logbook).
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from datetime import datetime
+
+from airport_reference import airport_record
+from bulk_load import LOGBOOK_COLUMNS, MINUTE_COLUMNS, load_airports, load_flights_frame
+from database import connect
+from incremental_import import sync_flights
+from instrumentation import instrumented_run, stage
+from logbook_cache import load_clean_logbook, read_clean_logbook
+from logbook_clean import FLOAT_COLUMNS, INTEGER_COLUMNS, airport_codes
+from logbook_reader import DEFAULT_CHUNK_SIZE, iter_clean_chunks
+from synthetic_logbook import DATA_DIR, synthetic_logbook
+
+SCHEMA = 'import_benchmark'
+# Stages the importers record, in table order; a variant may skip some
+STAGES = ['read', 'read cache', 'clean', 'resolve', 'load airports', 'load', 'merge', 'commit']
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+# A stage this much slower than in the compared report counts as a regression
+REGRESSION_RATIO = 1.10
+
+def column_type(column):
+    """SQL type of a flights column, matching shared/schema.ts"""
+    if column == 'flight_date':
+        return 'date NOT NULL'
+    if column in ('from_airport', 'to_airport'):
+        return 'text NOT NULL'
+    if column in FLOAT_COLUMNS:
+        return 'real'
+    if column in INTEGER_COLUMNS or column in MINUTE_COLUMNS.values():
+        return 'integer'
+    return 'text'
+
+def create_schema(conn):
+    """(Re)create the scratch schema with flights and airports and make it the search path"""
+    cursor = conn.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cursor.execute(f"CREATE SCHEMA {SCHEMA}")
+    cursor.execute(f"SET search_path TO {SCHEMA}")
+    columns = LOGBOOK_COLUMNS + list(MINUTE_COLUMNS.values())
+    cursor.execute(f"""
+        CREATE TABLE flights (
+            id serial PRIMARY KEY,
+            {', '.join(f'{column} {column_type(column)}' for column in columns)},
+            row_key text,
+            row_hash text
+        )
+    """)
+    cursor.execute("""
+        CREATE TABLE airports (
+            id serial PRIMARY KEY,
+            code text NOT NULL UNIQUE,
+            name text NOT NULL,
+            city text,
+            country text,
+            latitude real,
+            longitude real
+        )
+    """)
+    conn.commit()
+    cursor.close()
+
+def drop_schema(conn):
+    """Remove the scratch schema"""
+    conn.rollback()
+    cursor = conn.cursor()
+    cursor.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    conn.commit()
+    cursor.close()
+
+def reset_tables(conn):
+    """Empty the scratch tables between runs"""
+    cursor = conn.cursor()
+    cursor.execute("TRUNCATE flights, airports RESTART IDENTITY")
+    conn.commit()
+    cursor.close()
+
+def load_airport_records(conn, flights):
+    """Resolve and load the airports of a cleaned frame, as the importers do"""
+    codes = airport_codes(flights)
+    with stage('resolve', rows=len(codes)):
+        records = [airport_record(code) for code in codes]
+    load_airports(conn, records)
+
+def run_whole_sheet(conn, path, cache_dir):
+    """pd.read_excel, column-wise clean and one bulk load"""
+    flights, _, _ = load_clean_logbook(path, use_cache=False)
+    load_airport_records(conn, flights)
+    return load_flights_frame(conn, flights)['rows']
+
+def run_cached(conn, path, cache_dir):
+    """Whole-sheet import served from a warm logbook cache"""
+    flights, _, _ = load_clean_logbook(path, cache_dir=cache_dir)
+    load_airport_records(conn, flights)
+    return load_flights_frame(conn, flights)['rows']
+
+def run_stream(conn, path, cache_dir):
+    """Chunked openpyxl read with a clean, resolve and load per chunk"""
+    loaded = 0
+    seen_airports = set()
+    for flights, _, _ in iter_clean_chunks(path, DEFAULT_CHUNK_SIZE):
+        new_codes = [code for code in airport_codes(flights) if code not in seen_airports]
+        if new_codes:
+            with stage('resolve', rows=len(new_codes)):
+                records = [airport_record(code) for code in new_codes]
+            load_airports(conn, records)
+            seen_airports.update(new_codes)
+        loaded += load_flights_frame(conn, flights)['rows']
+    return loaded
+
+def run_incremental(conn, path, cache_dir):
+    """Re-sync of an unchanged logbook against an already synced table"""
+    flights, _, _ = load_clean_logbook(path, use_cache=False)
+    stats = sync_flights(conn, [flights])
+    load_airport_records(conn, flights)
+    return stats['staged']
+
+def warm_cache(conn, path, cache_dir):
+    """Fill the logbook cache the cached variant reads from"""
+    read_clean_logbook(path, cache_dir=cache_dir)
+
+def sync_once(conn, path, cache_dir):
+    """Sync the logbook once so the incremental variant finds nothing to change"""
+    flights, _, _ = load_clean_logbook(path, cache_dir=cache_dir)
+    sync_flights(conn, [flights])
+
+# Untimed setup run before a variant's instrumented run
+SETUP = {
+    'cached': warm_cache,
+    'incremental': sync_once,
+}
+
+VARIANTS = {
+    'whole-sheet': run_whole_sheet,
+    'cached': run_cached,
+    'stream': run_stream,
+    'incremental': run_incremental,
+}
+
+def run_variant(conn, name, path, trace_memory):
+    """Run one variant as an instrumented run, returning its run report and loaded row count"""
+    reset_tables(conn)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        if name in SETUP:
+            SETUP[name](conn, path, cache_dir)
+        options = argparse.Namespace(trace_memory=trace_memory)
+        with instrumented_run(f"benchmark {name}", options, summary=False) as run:
+            loaded = VARIANTS[name](conn, path, cache_dir)
+    return run.report, loaded
+
+def run_benchmark(conn, sizes, variants, seed, trace_memory=False):
+    """Run each variant over each size, returning one result dict per run"""
+    results = []
+    for size in sizes:
+        path = synthetic_logbook(size, seed)
+        for name in variants:
+            report, loaded = run_variant(conn, name, path, trace_memory)
+            timings = {entry['name']: entry['wall_seconds'] for entry in report['stages']}
+            total = report['wall_seconds']
+            result = {
+                'rows': size,
+                'variant': name,
+                'stages': {key: timings.get(key, 0.0) for key in STAGES},
+                'stage_details': report['stages'],
+                'loaded': loaded,
+                'seconds': total,
+                'cpu_seconds': report['cpu_seconds'],
+                'process_peak_rss_mb': report['process_peak_rss_mb'],
+                'rows_per_sec': round(size / total) if total > 0 else 0,
+            }
+            results.append(result)
+            print_result(result)
+    return results
+
+def stage_width(name):
+    """Table column width of a stage"""
+    return max(9, len(name) + 2)
+
+def print_header():
+    """Column headings for print_result"""
+    print(f"{'rows':>9} {'variant':<12}" + ''.join(f"{name:>{stage_width(name)}}" for name in STAGES)
+          + f"{'total':>9}{'cpu':>9} {'rows/sec':>10}")
+
+def print_result(result):
+    """One line of the benchmark table"""
+    print(f"{result['rows']:>9,} {result['variant']:<12}"
+          + ''.join(f"{result['stages'][name]:>{stage_width(name) - 1}.2f}s" for name in STAGES)
+          + f"{result['seconds']:>8.2f}s{result['cpu_seconds']:>8.2f}s {result['rows_per_sec']:>10,}")
+
+def git_commit():
+    """Commit the benchmark ran against, when run from a git checkout"""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+def compare_reports(previous, results):
+    """Print stages slower than in a previous report, returning the regression count"""
+    baseline = {(result['rows'], result['variant']): result for result in previous['results']}
+    regressions = 0
+    print(f"\nCompared with {previous.get('commit') or 'previous run'} ({previous['generated_on']}):")
+    for result in results:
+        old = baseline.get((result['rows'], result['variant']))
+        if not old:
+            continue
+        for name in STAGES + ['seconds']:
+            before = old['stages'].get(name, 0.0) if name in STAGES else old['seconds']
+            after = result['stages'][name] if name in STAGES else result['seconds']
+            # Ignore noise on stages too short to time meaningfully
+            if before >= 0.05 and after > before * REGRESSION_RATIO:
+                regressions += 1
+                print(f"  slower: {result['rows']:,} rows {result['variant']} {name} "
+                      f"{before:.2f}s -> {after:.2f}s ({after / before:.2f}x)")
+    if not regressions:
+        print("  no regressions")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the logbook importers on synthetic data")
+    parser.add_argument('--database-url', default=os.getenv('BENCHMARK_DATABASE_URL'),
+                        help="throwaway database to load into (default: $BENCHMARK_DATABASE_URL)")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES,
+                        help="logbook sizes in rows (default: 1000 10000 100000)")
+    parser.add_argument('--variants', nargs='+', choices=sorted(VARIANTS), default=list(VARIANTS),
+                        help="importer variants to run (default: all)")
+    parser.add_argument('--seed', type=int, default=0,
+                        help="seed for the synthetic logbooks")
+    parser.add_argument('--report', help="where to write the JSON report (default: .benchmark-data/)")
+    parser.add_argument('--compare', metavar='REPORT',
+                        help="previous JSON report to check for regressions")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="track Python allocations with tracemalloc (slower)")
+    args = parser.parse_args()
+
+    if not args.database_url:
+        parser.error("point --database-url (or BENCHMARK_DATABASE_URL) at a throwaway database")
+    os.environ['DATABASE_URL'] = args.database_url
+
+    conn = connect()
+    try:
+        create_schema(conn)
+        print_header()
+        results = run_benchmark(conn, args.sizes, args.variants, args.seed, args.trace_memory)
+    finally:
+        drop_schema(conn)
+        conn.close()
+
+    report = {
+        'generated_on': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'seed': args.seed,
+        'results': results,
+    }
+    path = args.report or os.path.join(DATA_DIR, f"report-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nReport written to {path}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            if compare_reports(json.load(f), results):
+                return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Build the deduplicated route network for the flights map.
+
+Groups every flight into one edge per airport pair (either direction)
+with its flight count, first/last flown dates and total minutes, resolves
+airport coordinates once, and precomputes each edge's great-circle
+polyline. Edges are stored in the flight_routes table; --json also
+writes a static artifact with the edges and the airport markers, so the
+map loads O(routes) data and never computes geodesics in the browser.
+Routes with an airport that has no coordinates can't be drawn; they are
+counted on every run and listed in the artifact. Usage:
+
+    python build-route-graph.py
+    python build-route-graph.py --json ../client/public/data/route-graph.json
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+
+import numpy as np
+
+from airport_reference import lookup
+from bulk_load import copy_rows
+from database import connect_to_db
+from great_circle import great_circle_path, haversine_nm, resolve_coordinates, table_coordinates
+
+DEFAULT_JSON_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                 '..', 'client', 'public', 'data', 'route-graph.json')
+
+ROUTE_COLUMNS = ['from_airport', 'to_airport', 'flights', 'first_flown', 'last_flown',
+                 'total_minutes', 'distance', 'path']
+
+def ensure_routes_table(cursor):
+    """Create flight_routes if this database does not have it yet"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS flight_routes (
+            id serial PRIMARY KEY,
+            from_airport text NOT NULL,
+            to_airport text NOT NULL,
+            flights integer NOT NULL,
+            first_flown date,
+            last_flown date,
+            total_minutes integer,
+            distance double precision,
+            path text,
+            UNIQUE (from_airport, to_airport)
+        )
+    """)
+
+def read_edges(cursor):
+    """One row per unordered airport pair, aggregated in the database"""
+    cursor.execute("""
+        SELECT LEAST(from_airport, to_airport), GREATEST(from_airport, to_airport),
+               COUNT(*), MIN(flight_date), MAX(flight_date), SUM(total_time_minutes)
+        FROM flights
+        WHERE from_airport <> to_airport
+        GROUP BY 1, 2
+        ORDER BY 1, 2
+    """)
+    return cursor.fetchall()
+
+def read_movements(cursor):
+    """Departures plus arrivals per airport code"""
+    cursor.execute("""
+        SELECT code, COUNT(*) FROM (
+            SELECT from_airport AS code FROM flights
+            UNION ALL
+            SELECT to_airport FROM flights
+        ) movements
+        GROUP BY code
+        ORDER BY code
+    """)
+    return cursor.fetchall()
+
+def build_route_graph(json_path=None):
+    """Rebuild flight_routes and optionally write the JSON artifact"""
+    conn = connect_to_db()
+    if not conn:
+        return False
+
+    try:
+        cursor = conn.cursor()
+        stored = table_coordinates(cursor)
+        edges = read_edges(cursor)
+        movements = read_movements(cursor)
+        print(f"Found {len(edges)} routes between {len(movements)} airports")
+
+        codes = [code for code, _ in movements]
+        latitude, longitude = resolve_coordinates(codes, stored)
+        position = {code: i for i, code in enumerate(codes)}
+
+        routes = []
+        unresolved = []
+        for from_code, to_code, flights, first_flown, last_flown, minutes in edges:
+            i, j = position[from_code], position[to_code]
+            if np.isnan(latitude[i]) or np.isnan(latitude[j]):
+                unresolved.append((from_code, to_code, flights))
+                continue
+            path = np.round(great_circle_path(latitude[i], longitude[i], latitude[j], longitude[j]), 4)
+            routes.append({
+                'from': from_code,
+                'to': to_code,
+                'flights': flights,
+                'firstFlown': first_flown.isoformat(),
+                'lastFlown': last_flown.isoformat(),
+                'totalMinutes': minutes,
+                'distance': round(float(haversine_nm(latitude[i], longitude[i],
+                                                     latitude[j], longitude[j])), 1),
+                'path': path.tolist(),
+            })
+        missing = sorted({code for from_code, to_code, _ in unresolved for code in (from_code, to_code)
+                          if np.isnan(latitude[position[code]])})
+        print(f"Skipped {len(unresolved)} of {len(edges)} routes "
+              f"({sum(flights for _, _, flights in unresolved)} flights) without airport coordinates"
+              + (f": {', '.join(missing)}" if missing else ""))
+
+        ensure_routes_table(cursor)
+        cursor.execute("DELETE FROM flight_routes")
+        copy_rows(cursor, 'flight_routes', ROUTE_COLUMNS, (
+            (route['from'], route['to'], route['flights'], route['firstFlown'], route['lastFlown'],
+             route['totalMinutes'], route['distance'], json.dumps(route['path'], separators=(',', ':')))
+            for route in routes
+        ))
+        conn.commit()
+        print(f"Stored {len(routes)} routes in flight_routes")
+
+        if json_path:
+            airports = []
+            for code, count in movements:
+                i = position[code]
+                if np.isnan(latitude[i]):
+                    continue
+                entry = lookup(code)
+                airports.append({
+                    'code': code,
+                    'name': entry['name'] if entry else code,
+                    'lat': round(float(latitude[i]), 4),
+                    'lng': round(float(longitude[i]), 4),
+                    'movements': count,
+                })
+            graph = {
+                'generatedOn': datetime.now().isoformat(),
+                'airports': airports,
+                'routes': routes,
+                # Routes left off the map because an airport has no coordinates
+                'skippedRoutes': [{'from': from_code, 'to': to_code, 'flights': flights}
+                                  for from_code, to_code, flights in unresolved],
+            }
+            os.makedirs(os.path.dirname(os.path.abspath(json_path)), exist_ok=True)
+            with open(json_path + '.tmp', 'w', encoding='utf-8') as f:
+                json.dump(graph, f, separators=(',', ':'))
+            os.replace(json_path + '.tmp', json_path)
+            print(f"Wrote {json_path} ({os.path.getsize(json_path) / 1024:.0f} KB)")
+
+        cursor.close()
+        return True
+
+    except Exception as e:
+        print(f"Error building route graph: {e}")
+        return False
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the deduplicated route network for the flights map")
+    parser.add_argument('--json', nargs='?', const=DEFAULT_JSON_PATH, metavar='PATH',
+                        help="also write the graph as static JSON (default: client/public/data/route-graph.json)")
+    args = parser.parse_args()
+
+    success = build_route_graph(json_path=args.json)
+    sys.exit(0 if success else 1)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+COPY-based bulk loader shared by the flight logbook importers.
+
+Cleaned rows are streamed into a temporary staging table with
+COPY FROM STDIN and merged into the real table with a single
+INSERT ... SELECT, instead of one INSERT round trip per row.
+"""
+import io
+import time
+
+from flight_partitions import (attach_year_table, create_year_table, drop_year_partition,
+                                ensure_year_partitions, is_partitioned, year_partitions)
+from instrumentation import stage
+
+# Flights columns that come straight from the logbook
+LOGBOOK_COLUMNS = [
+    'flight_date', 'flight_number', 'from_airport', 'to_airport',
+    'selected_crew_pic', 'selected_crew_sic', 'selected_crew_relief', 'selected_crew_student',
+    'actual_departure_time', 'actual_arrival_time', 'distance', 'total_time',
+    'pic', 'sic', 'night', 'actual_instrument', 'dual_received', 'dual_given',
+    'simulator', 'pic_night', 'sic_night', 'dual_received_night',
+    'aircraft_id', 'aircraft_type', 'aircraft_make', 'aircraft_model',
+    'engine_type', 'category', 'aircraft_class', 'notes',
+]
+
+# Numeric minute columns derived from the "H:MM" / decimal-hour text columns
+MINUTE_COLUMNS = {
+    'total_time': 'total_time_minutes',
+    'pic': 'pic_minutes',
+    'sic': 'sic_minutes',
+    'night': 'night_minutes',
+    'actual_instrument': 'actual_instrument_minutes',
+    'simulator': 'simulator_minutes',
+    'pic_night': 'pic_night_minutes',
+    'sic_night': 'sic_night_minutes',
+}
+
+# Column order used by every importer when handing rows to the loader
+FLIGHT_COLUMNS = LOGBOOK_COLUMNS + list(MINUTE_COLUMNS.values())
+
+# Columns added after the original schema, created on demand by the loaders
+DERIVED_COLUMN_TYPES = {column: 'integer' for column in MINUTE_COLUMNS.values()}
+
+AIRPORT_COLUMNS = ['code', 'name', 'city', 'country', 'latitude', 'longitude']
+
+def format_copy_value(value):
+    """Format a Python value for PostgreSQL's COPY text format"""
+    if value is None:
+        return '\\N'
+    if isinstance(value, float) and value != value:  # NaN
+        return '\\N'
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    text = str(value)
+    return (text.replace('\\', '\\\\')
+                .replace('\t', '\\t')
+                .replace('\n', '\\n')
+                .replace('\r', '\\r'))
+
+def rows_to_copy_buffer(rows):
+    """Serialize row tuples into an in-memory COPY text buffer"""
+    buffer = io.StringIO()
+    for row in rows:
+        buffer.write('\t'.join(format_copy_value(value) for value in row))
+        buffer.write('\n')
+    buffer.seek(0)
+    return buffer
+
+def copy_rows(cursor, table, columns, rows):
+    """Stream rows into a table with COPY FROM STDIN, returning the row count"""
+    rows = list(rows)
+    buffer = rows_to_copy_buffer(rows)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN",
+        buffer
+    )
+    return len(rows)
+
+def ensure_columns(cursor, table, column_types):
+    """Add any of the given columns that the table does not have yet"""
+    cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = %s
+    """, (table,))
+    existing = {row[0] for row in cursor.fetchall()}
+    for column, column_type in column_types.items():
+        if column not in existing:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {column_type}")
+
+def create_staging_table(cursor, table, columns):
+    """Create an empty temp table shaped like the given columns of a real table"""
+    staging = f"{table}_staging"
+    cursor.execute(f"DROP TABLE IF EXISTS pg_temp.{staging}")
+    cursor.execute(f"""
+        CREATE TEMP TABLE {staging} ON COMMIT DROP AS
+        SELECT {', '.join(columns)} FROM {table} WITH NO DATA
+    """)
+    return staging
+
+def copy_frame(cursor, table, frame):
+    """Stream a DataFrame into a table with COPY ... FORMAT csv, returning the row count
+
+    pandas writes the CSV for whole columns at once, so no per-value Python
+    formatting runs. Empty (unquoted) fields load as NULL.
+    """
+    buffer = io.StringIO()
+    frame.to_csv(buffer, index=False, header=False, date_format='%Y-%m-%d')
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(frame.columns)}) FROM STDIN WITH (FORMAT csv)",
+        buffer
+    )
+    return len(frame)
+
+def merge_flights(conn, columns, fill_staging):
+    """Fill a flights staging table with fill_staging(cursor, staging) and merge it"""
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        with stage('load') as counts:
+            ensure_columns(cursor, 'flights', DERIVED_COLUMN_TYPES)
+            staging = create_staging_table(cursor, 'flights', columns)
+            fill_staging(cursor, staging)
+            ensure_year_partitions(cursor, staging)
+            column_list = ', '.join(columns)
+            cursor.execute(f"""
+                INSERT INTO flights ({column_list})
+                SELECT {column_list} FROM {staging}
+            """)
+            loaded = counts['rows'] = cursor.rowcount
+        with stage('commit'):
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return load_stats(loaded, start)
+
+def load_flights_frame(conn, flights):
+    """Bulk load a cleaned flights DataFrame through a staging table and a single merge"""
+    return merge_flights(
+        conn, list(flights.columns),
+        lambda cursor, staging: copy_frame(cursor, staging, flights)
+    )
+
+def replace_flight_years(conn, flights, years=None):
+    """Replace whole years of a partitioned flights table with a cleaned frame's rows
+
+    Each year is COPYed into a fresh table, then all of them are swapped in
+    for their partitions in one short transaction. years=None treats the
+    frame as the complete logbook: every year in it is replaced and
+    partitions for years it no longer has are dropped. A year listed in
+    years but absent from the frame ends up empty.
+    """
+    start = time.perf_counter()
+    flight_years = flights['flight_date'].dt.year
+    cursor = conn.cursor()
+    try:
+        if not is_partitioned(cursor):
+            raise Exception("flights is not partitioned by year; run partition-flights.py first")
+        ensure_columns(cursor, 'flights', DERIVED_COLUMN_TYPES)
+        existing = year_partitions(cursor)
+        replaced = sorted(set(flight_years.unique().tolist()) if years is None else set(years))
+        dropped = [year for year in existing if year not in replaced] if years is None else []
+
+        loaded = 0
+        tables = {}
+        with stage('load') as counts:
+            for year in replaced:
+                tables[year] = create_year_table(cursor, year)
+                loaded += copy_frame(cursor, tables[year], flights[flight_years == year])
+            conn.commit()
+            counts['rows'] = loaded
+
+        with stage('attach', rows=len(replaced)):
+            for year in replaced:
+                attach_year_table(cursor, year, tables[year])
+            for year in dropped:
+                drop_year_partition(cursor, year)
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return dict(load_stats(loaded, start), replaced=replaced, dropped=dropped)
+
+def load_airports(conn, records):
+    """Bulk load airport records, keeping any airport that already exists"""
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        with stage('load airports') as counts:
+            staging = create_staging_table(cursor, 'airports', AIRPORT_COLUMNS)
+            copy_rows(cursor, staging, AIRPORT_COLUMNS, records)
+            column_list = ', '.join(AIRPORT_COLUMNS)
+            cursor.execute(f"""
+                INSERT INTO airports ({column_list})
+                SELECT DISTINCT ON (code) {column_list} FROM {staging}
+                ORDER BY code
+                ON CONFLICT (code) DO NOTHING
+            """)
+            loaded = counts['rows'] = cursor.rowcount
+        with stage('commit'):
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return load_stats(loaded, start)
+
+def load_stats(rows, start):
+    """Build the timing summary returned by the load functions"""
+    seconds = time.perf_counter() - start
+    return {
+        'rows': rows,
+        'seconds': seconds,
+        'rows_per_sec': rows / seconds if seconds > 0 else 0.0,
+    }
+
+def print_load_stats(label, stats):
+    """Print a one-line throughput report for a load"""
+    print(f"Loaded {stats['rows']} {label} in {stats['seconds']:.2f}s "
+          f"({stats['rows_per_sec']:,.0f} rows/sec)")
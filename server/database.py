@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Shared PostgreSQL connections for the Python scripts.
+
+Connection settings come from DATABASE_URL when it is set; anything it
+leaves out (or everything, when it is unset) comes from the standard
+PGHOST, PGPORT, PGDATABASE, PGUSER and PGPASSWORD variables, which libpq
+reads itself. Every connection gets a server-side statement_timeout.
+
+Scripts that need several connections at once (parallel imports and
+exports) borrow them from one process-wide ThreadedConnectionPool instead
+of handshaking again for every table or file.
+"""
+import os
+import threading
+from contextlib import contextmanager
+
+import psycopg2
+import psycopg2.extensions
+import psycopg2.pool
+
+# Server-side limit for any one statement; 0 disables it
+STATEMENT_TIMEOUT = os.getenv('PGSTATEMENT_TIMEOUT', '30min')
+
+# Connections kept by the pool unless a caller asks for more up front
+POOL_SIZE = int(os.getenv('PGPOOL_SIZE', 8))
+
+class Connection(psycopg2.extensions.connection):
+    """psycopg2 connection with the shared session settings"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.configure()
+
+    def configure(self):
+        """Apply the session settings every script expects"""
+        cursor = self.cursor()
+        cursor.execute("SET statement_timeout = %s", (str(STATEMENT_TIMEOUT),))
+        cursor.close()
+        self.commit()
+
+def database_dsn():
+    """DATABASE_URL, or an empty DSN so libpq falls back to the PG* variables"""
+    return os.getenv('DATABASE_URL', '')
+
+def connect():
+    """Open a new connection with the shared settings"""
+    return psycopg2.connect(database_dsn(), connection_factory=Connection)
+
+def connect_to_db():
+    """Connect to PostgreSQL, printing the error and returning None on failure"""
+    try:
+        return connect()
+    except Exception as e:
+        print(f"Database connection error: {e}")
+        return None
+
+_pool = None
+_pool_lock = threading.Lock()
+
+def connection_pool(size=None):
+    """The process-wide connection pool, created on first use
+
+    size (default POOL_SIZE) is the most connections that can be borrowed
+    at once and only applies to the call that creates the pool, so
+    parallel entry points should call this with their worker count before
+    starting any threads.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = psycopg2.pool.ThreadedConnectionPool(
+                1, max(size or POOL_SIZE, 1), database_dsn(), connection_factory=Connection
+            )
+        return _pool
+
+@contextmanager
+def pooled_connection():
+    """Borrow a connection from the pool, returning it in a clean state
+
+    Uncommitted work is rolled back and session characteristics such as
+    set_session(readonly=True) are reset before the next borrower gets it.
+    """
+    pool = connection_pool()
+    conn = pool.getconn()
+    try:
+        yield conn
+    finally:
+        if conn.closed:
+            pool.putconn(conn, close=True)
+        else:
+            try:
+                conn.reset()
+                conn.configure()
+                pool.putconn(conn)
+            except psycopg2.Error:
+                pool.putconn(conn, close=True)
+
+def close_pool():
+    """Close every pooled connection"""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.closeall()
+            _pool = None
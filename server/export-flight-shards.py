@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+"""
+Rebuild the per-month and per-year flight shards served by /api/flights.
+
+The importers already do this after every load (see flight_shards.py);
+run it by hand after editing flights directly or to move the shards.
+Usage:
+
+    python export-flight-shards.py
+    python export-flight-shards.py --dir /srv/wolfslair/flight-shards
+"""
+import argparse
+import sys
+
+from database import connect_to_db
+from flight_shards import SHARD_DIR, print_shard_stats, write_flight_shards
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write pre-serialized JSON shards of the flights table")
+    parser.add_argument('--dir', default=SHARD_DIR,
+                        help="shard directory, also read by the server as FLIGHT_SHARDS_DIR "
+                             "(default: data/flight-shards)")
+    args = parser.parse_args()
+
+    conn = connect_to_db()
+    if not conn:
+        sys.exit(1)
+    try:
+        print_shard_stats(write_flight_shards(conn, args.dir))
+    except Exception as e:
+        print(f"Error writing flight shards: {e}")
+        sys.exit(1)
+    finally:
+        conn.close()
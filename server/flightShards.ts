@@ -0,0 +1,77 @@
+import fs from "fs";
+import path from "path";
+import zlib from "zlib";
+import type { Request, Response } from "express";
+
+// Month ("2024-05") and year ("2024") shards written by server/flight_shards.py after each import
+const shardDir = process.env.FLIGHT_SHARDS_DIR
+  ? path.resolve(process.env.FLIGHT_SHARDS_DIR)
+  : path.resolve(process.cwd(), "data", "flight-shards");
+
+interface FlightShard {
+  file: string;
+  period: "month" | "year";
+  flights: number;
+  sha256: string;
+  bytes: number;
+}
+
+interface ShardManifest {
+  generatedOn: string;
+  shards: Record<string, FlightShard>;
+}
+
+let cachedManifest: { mtimeMs: number; manifest: ShardManifest } | null = null;
+
+function readManifest(): ShardManifest | null {
+  const manifestPath = path.join(shardDir, "manifest.json");
+  let stat: fs.Stats;
+  try {
+    stat = fs.statSync(manifestPath);
+  } catch {
+    return null;
+  }
+  // Re-read only after an import has rewritten it
+  if (!cachedManifest || cachedManifest.mtimeMs !== stat.mtimeMs) {
+    cachedManifest = {
+      mtimeMs: stat.mtimeMs,
+      manifest: JSON.parse(fs.readFileSync(manifestPath, "utf-8")),
+    };
+  }
+  return cachedManifest.manifest;
+}
+
+// Sends the pre-serialized flights for a period, or returns false so the caller queries the database
+export function sendFlightShard(req: Request, res: Response, key: string): boolean {
+  const shard = readManifest()?.shards[key];
+  if (!shard) {
+    return false;
+  }
+  const shardPath = path.join(shardDir, shard.file);
+  if (!fs.existsSync(shardPath)) {
+    return false;
+  }
+
+  // The gzip and identity bodies are different representations, so each gets its own ETag
+  const gzip = Boolean(req.acceptsEncodings("gzip"));
+  const etag = gzip ? `"${shard.sha256}-gz"` : `"${shard.sha256}"`;
+  res.set({
+    ETag: etag,
+    "Cache-Control": "public, no-cache",
+    Vary: "Accept-Encoding",
+  });
+  const ifNoneMatch = req.headers["if-none-match"];
+  if (ifNoneMatch && ifNoneMatch.split(",").some((tag) => tag.trim().replace(/^W\//, "") === etag)) {
+    res.status(304).end();
+    return true;
+  }
+
+  const body = fs.readFileSync(shardPath);
+  res.type("application/json");
+  if (gzip) {
+    res.set("Content-Encoding", "gzip").send(body);
+  } else {
+    res.send(zlib.gunzipSync(body));
+  }
+  return true;
+}
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Deferred secondary indexes for bulk flight loads.
+
+A replacing import drops every secondary index on flights before it
+loads, so COPY and INSERT ... SELECT don't maintain them row by row.
+Afterwards it builds the indexes the app queries by: flight_date for the
+by-date and date-range lookups, and from_airport / to_airport for the
+map's joins to airports.code. Any other index that was dropped is rebuilt
+too. Finally it runs ANALYZE so the planner sees the fresh data.
+
+Indexes are built in parallel, one connection each. A plain CREATE INDEX
+only blocks writes, and nothing else writes flights during an import.
+With online=True they are built with CREATE INDEX CONCURRENTLY instead,
+for rebuilding under live traffic. PostgreSQL runs those one at a time
+per table.
+
+deferred_flight_indexes wraps a load so the indexes are rebuilt even
+when it fails; a failed load must not leave flights without them.
+"""
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from database import connect
+from instrumentation import stage
+
+# Names match the indexes declared on flights in shared/schema.ts
+FLIGHT_INDEXES = {
+    'flights_flight_date_idx': "CREATE INDEX flights_flight_date_idx ON flights USING btree (flight_date)",
+    'flights_from_airport_idx': "CREATE INDEX flights_from_airport_idx ON flights USING btree (from_airport)",
+    'flights_to_airport_idx': "CREATE INDEX flights_to_airport_idx ON flights USING btree (to_airport)",
+}
+
+CREATE_INDEX_PATTERN = re.compile(r'^CREATE (UNIQUE )?INDEX ', re.IGNORECASE)
+
+def secondary_indexes(cursor, table='flights'):
+    """(name, definition) of every index on table that does not back a constraint"""
+    cursor.execute("""
+        SELECT i.indexname, i.indexdef
+        FROM pg_indexes i
+        WHERE i.schemaname = current_schema() AND i.tablename = %s
+        AND NOT EXISTS (
+            SELECT 1 FROM pg_constraint c
+            WHERE c.conindid = format('%%I.%%I', i.schemaname, i.indexname)::regclass
+        )
+        ORDER BY i.indexname
+    """, (table,))
+    return cursor.fetchall()
+
+def defer_flight_indexes(conn):
+    """Drop the secondary indexes on flights, returning the definitions to build after the load"""
+    cursor = conn.cursor()
+    try:
+        indexes = secondary_indexes(cursor)
+        for name, _ in indexes:
+            cursor.execute(f'DROP INDEX IF EXISTS "{name}"')
+        conn.commit()
+    finally:
+        cursor.close()
+    print(f"Dropped {len(indexes)} secondary indexes on flights until the load is done")
+    definitions = dict(indexes)
+    definitions.update(FLIGHT_INDEXES)
+    return list(definitions.values())
+
+def build_index(definition, online=False):
+    """Run one CREATE INDEX on its own autocommit connection, returning (name, seconds)"""
+    prefix = r'CREATE \1INDEX CONCURRENTLY IF NOT EXISTS ' if online else r'CREATE \1INDEX IF NOT EXISTS '
+    statement = CREATE_INDEX_PATTERN.sub(prefix, definition, count=1)
+    name = statement.split(' IF NOT EXISTS ', 1)[1].split()[0]
+    start = time.perf_counter()
+    conn = connect()
+    try:
+        # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+        conn.autocommit = True
+        cursor = conn.cursor()
+        cursor.execute(statement)
+        cursor.close()
+    finally:
+        conn.close()
+    return name, time.perf_counter() - start
+
+def build_flight_indexes(definitions=None, online=False):
+    """Build the flights indexes (in parallel unless online) and ANALYZE the table
+
+    definitions defaults to FLIGHT_INDEXES, which also creates them on a
+    database that predates them. Returns per-index and total timings.
+    """
+    start = time.perf_counter()
+    definitions = list(definitions or FLIGHT_INDEXES.values())
+    with stage('index', rows=len(definitions)):
+        if online:
+            timings = [build_index(definition, online=True) for definition in definitions]
+        else:
+            with ThreadPoolExecutor(max_workers=max(len(definitions), 1)) as pool:
+                timings = list(pool.map(build_index, definitions))
+
+    analyze_start = time.perf_counter()
+    with stage('analyze'):
+        conn = connect()
+        try:
+            conn.autocommit = True
+            cursor = conn.cursor()
+            cursor.execute("ANALYZE flights")
+            cursor.execute("ANALYZE airports")
+            cursor.close()
+        finally:
+            conn.close()
+
+    return {
+        'indexes': dict(timings),
+        'analyze_seconds': time.perf_counter() - analyze_start,
+        'seconds': time.perf_counter() - start,
+    }
+
+@contextmanager
+def deferred_flight_indexes(conn):
+    """Drop the flights indexes for the duration of a load and always rebuild them
+
+    Yields a dict that receives the build_flight_indexes stats. A failed
+    load's transaction is rolled back first, since the index builds run
+    on other connections and would wait on its locks.
+    """
+    definitions = defer_flight_indexes(conn)
+    stats = {}
+    try:
+        yield stats
+    except BaseException:
+        conn.rollback()
+        raise
+    finally:
+        stats.update(build_flight_indexes(definitions))
+
+def print_index_stats(stats):
+    """Print the index build and ANALYZE timings"""
+    print(f"Built {len(stats['indexes'])} flights indexes and analyzed in {stats['seconds']:.2f}s")
+    for name, seconds in stats['indexes'].items():
+        print(f"  {name}: {seconds:.2f}s")
+    print(f"  ANALYZE: {stats['analyze_seconds']:.2f}s")
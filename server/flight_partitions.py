@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Optional year partitioning of the flights table.
+
+partition-flights.py turns flights into a table range-partitioned by
+flight_date, with one partition per year (flights_y2024 holds 2024). The
+parent keeps the same name, columns, id sequence and indexes. The primary
+key becomes (id, flight_date), since it must include the partition key.
+
+Once flights is partitioned:
+
+- Month and date-range queries are pruned to one partition.
+- The bulk loaders create any missing year partition before they merge
+  rows (ensure_year_partitions).
+- Replacing a year loads a fresh table, then swaps it in with DETACH /
+  ATTACH PARTITION instead of deleting rows. A CHECK constraint matching
+  the partition bounds lets the ATTACH skip its validation scan.
+- Years not being replaced are never written.
+- Partitions are only created, attached or dropped under a transaction
+  advisory lock, so parallel loaders (import-logbooks.py's writer
+  threads) never race to create the same year.
+
+Everything here is a no-op on an unpartitioned flights table.
+"""
+import time
+
+from flight_indexes import build_flight_indexes, secondary_indexes
+from instrumentation import stage
+
+def partition_name(year):
+    """Name of the partition holding one year of flights"""
+    return f"flights_y{int(year)}"
+
+def year_bounds(year):
+    """FOR VALUES bounds of a year partition"""
+    return f"FROM ('{int(year):04d}-01-01') TO ('{int(year) + 1:04d}-01-01')"
+
+def is_partitioned(cursor):
+    """Whether flights is a partitioned table"""
+    cursor.execute("""
+        SELECT c.relkind = 'p' FROM pg_class c
+        WHERE c.oid = to_regclass(current_schema() || '.flights')
+    """)
+    row = cursor.fetchone()
+    return bool(row and row[0])
+
+def year_partitions(cursor):
+    """Years that have a partition, ascending"""
+    cursor.execute("""
+        SELECT child.relname FROM pg_inherits i
+        JOIN pg_class child ON child.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(current_schema() || '.flights')
+    """)
+    names = [row[0] for row in cursor.fetchall()]
+    return sorted(int(name[len('flights_y'):]) for name in names
+                  if name.startswith('flights_y') and name[len('flights_y'):].isdigit())
+
+def lock_partitions(cursor):
+    """Serialize partition changes until the current transaction ends"""
+    cursor.execute("SELECT pg_advisory_xact_lock(hashtext('flights partitions'))")
+
+def create_year_partitions(cursor, years):
+    """Create the partitions for years that don't have one, returning the years created
+
+    Only a transaction that finds a year missing takes the partition lock,
+    then checks again in case another loader created it meanwhile.
+    """
+    wanted = set(int(year) for year in years)
+    if not wanted - set(year_partitions(cursor)):
+        return []
+    lock_partitions(cursor)
+    created = sorted(wanted - set(year_partitions(cursor)))
+    for year in created:
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {partition_name(year)}
+            PARTITION OF flights FOR VALUES {year_bounds(year)}
+        """)
+    return created
+
+def ensure_year_partitions(cursor, staging):
+    """Create the year partitions rows in a staging table need, when flights is partitioned"""
+    if not is_partitioned(cursor):
+        return []
+    cursor.execute(f"""
+        SELECT DISTINCT extract(year FROM flight_date)::int FROM {staging}
+        WHERE flight_date IS NOT NULL
+    """)
+    created = create_year_partitions(cursor, [row[0] for row in cursor.fetchall()])
+    if created:
+        print(f"Created flights partitions for {', '.join(map(str, created))}")
+    return created
+
+def create_year_table(cursor, year):
+    """Create an empty standalone table shaped like flights to load one year into"""
+    table = f"{partition_name(year)}_load"
+    cursor.execute(f"DROP TABLE IF EXISTS {table}")
+    cursor.execute(f"CREATE TABLE {table} (LIKE flights INCLUDING DEFAULTS)")
+    # Lets ATTACH PARTITION trust the bounds instead of scanning the rows
+    cursor.execute(f"""
+        ALTER TABLE {table} ADD CONSTRAINT {table}_year
+        CHECK (flight_date >= '{int(year):04d}-01-01' AND flight_date < '{int(year) + 1:04d}-01-01')
+    """)
+    return table
+
+def attach_year_table(cursor, year, table):
+    """Swap a loaded year table in for the year's partition
+
+    ATTACH builds the partitioned indexes on the new partition. DETACH
+    locks flights exclusively, so commit soon after.
+    """
+    partition = partition_name(year)
+    lock_partitions(cursor)
+    if year in year_partitions(cursor):
+        cursor.execute(f"ALTER TABLE flights DETACH PARTITION {partition}")
+        cursor.execute(f"DROP TABLE {partition}")
+    cursor.execute(f"ALTER TABLE {table} RENAME TO {partition}")
+    cursor.execute(f"ALTER TABLE flights ATTACH PARTITION {partition} FOR VALUES {year_bounds(year)}")
+    cursor.execute(f"ALTER TABLE {partition} DROP CONSTRAINT {table}_year")
+
+def drop_year_partition(cursor, year):
+    """Detach and drop one year of flights"""
+    partition = partition_name(year)
+    lock_partitions(cursor)
+    cursor.execute(f"ALTER TABLE flights DETACH PARTITION {partition}")
+    cursor.execute(f"DROP TABLE {partition}")
+
+def partition_flights(conn):
+    """Rebuild flights as a table range-partitioned by flight_date year
+
+    Runs in one transaction: the rows are copied into a new partitioned
+    table, which then replaces flights and takes over its id sequence.
+    The secondary indexes are rebuilt afterwards.
+    """
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        if is_partitioned(cursor):
+            print("flights is already partitioned")
+            return None
+
+        indexes = [definition for _, definition in secondary_indexes(cursor)]
+        cursor.execute("SELECT pg_get_serial_sequence('flights', 'id')")
+        sequence = cursor.fetchone()[0]
+        cursor.execute("SELECT DISTINCT extract(year FROM flight_date)::int FROM flights ORDER BY 1")
+        years = [row[0] for row in cursor.fetchall()]
+
+        with stage('partition', rows=len(years)):
+            # Keep the sequence alive when the old table is dropped
+            cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY NONE")
+            cursor.execute("""
+                CREATE TABLE flights_partitioned (LIKE flights INCLUDING DEFAULTS)
+                PARTITION BY RANGE (flight_date)
+            """)
+            cursor.execute("""
+                ALTER TABLE flights_partitioned
+                ADD CONSTRAINT flights_partitioned_pkey PRIMARY KEY (id, flight_date)
+            """)
+            for year in years:
+                cursor.execute(f"""
+                    CREATE TABLE {partition_name(year)}
+                    PARTITION OF flights_partitioned FOR VALUES {year_bounds(year)}
+                """)
+
+        with stage('load') as counts:
+            cursor.execute("INSERT INTO flights_partitioned SELECT * FROM flights")
+            rows = counts['rows'] = cursor.rowcount
+
+        cursor.execute("DROP TABLE flights")
+        cursor.execute("ALTER TABLE flights_partitioned RENAME TO flights")
+        cursor.execute("ALTER TABLE flights RENAME CONSTRAINT flights_partitioned_pkey TO flights_pkey")
+        cursor.execute(f"ALTER SEQUENCE {sequence} OWNED BY flights.id")
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    index_stats = build_flight_indexes(indexes)
+    return {
+        'rows': rows,
+        'years': years,
+        'indexes': index_stats,
+        'seconds': time.perf_counter() - start,
+    }
+
+def print_partition_stats(stats):
+    """Print a summary of a year replacement"""
+    replaced = ', '.join(map(str, stats['replaced'])) or 'none'
+    print(f"Replaced flights for {replaced} with {stats['rows']} rows in {stats['seconds']:.2f}s")
+    if stats['dropped']:
+        print(f"  Dropped partitions for {', '.join(map(str, stats['dropped']))} (no longer in the logbook)")
@@ -0,0 +1,195 @@
+#!/usr/bin/env python3
+"""
+Pre-serialized flight shards for the calendar view.
+
+After an import, every month and every year of flights is written as a
+gzipped JSON file shaped exactly like the /api/flights response (the
+camelCase keys of shared/schema.ts, ordered by date). A manifest.json
+lists each shard with the sha256 of its JSON, from which the server
+derives one ETag per encoding; server/flightShards.ts hands the files
+out without touching the database. PostgreSQL builds the JSON, so Python
+never formats rows.
+
+Shards whose content hash is unchanged are not rewritten, and periods
+that no longer have flights are removed. After an append-only import
+only the periods holding flights above the id high-water mark are
+regenerated.
+"""
+import gzip
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+from instrumentation import stage
+
+# Shared with server/flightShards.ts through FLIGHT_SHARDS_DIR
+SHARD_DIR = os.getenv('FLIGHT_SHARDS_DIR') or os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), '..', 'data', 'flight-shards')
+
+MANIFEST = 'manifest.json'
+
+# flights column -> JSON key, in shared/schema.ts order
+FLIGHT_JSON_KEYS = {
+    'id': 'id',
+    'flight_date': 'flightDate',
+    'flight_number': 'flightNumber',
+    'from_airport': 'from',
+    'to_airport': 'to',
+    'selected_crew_pic': 'selectedCrewPIC',
+    'selected_crew_sic': 'selectedCrewSIC',
+    'selected_crew_relief': 'selectedCrewRelief',
+    'selected_crew_student': 'selectedCrewStudent',
+    'actual_departure_time': 'actualDepartureTime',
+    'actual_arrival_time': 'actualArrivalTime',
+    'distance': 'distance',
+    'total_time': 'totalTime',
+    'pic': 'pic',
+    'sic': 'sic',
+    'night': 'night',
+    'actual_instrument': 'actualInstrument',
+    'dual_received': 'dualReceived',
+    'dual_given': 'dualGiven',
+    'simulator': 'simulator',
+    'pic_night': 'picNight',
+    'sic_night': 'sicNight',
+    'dual_received_night': 'dualReceivedNight',
+    'aircraft_id': 'aircraftID',
+    'aircraft_type': 'aircraftType',
+    'aircraft_make': 'aircraftMake',
+    'aircraft_model': 'aircraftModel',
+    'engine_type': 'engineType',
+    'category': 'category',
+    'aircraft_class': 'aircraftClass',
+    'notes': 'notes',
+    'total_time_minutes': 'totalTimeMinutes',
+    'pic_minutes': 'picMinutes',
+    'sic_minutes': 'sicMinutes',
+    'night_minutes': 'nightMinutes',
+    'actual_instrument_minutes': 'actualInstrumentMinutes',
+    'simulator_minutes': 'simulatorMinutes',
+    'pic_night_minutes': 'picNightMinutes',
+    'sic_night_minutes': 'sicNightMinutes',
+    'row_key': 'rowKey',
+    'row_hash': 'rowHash',
+}
+
+# Shard period -> to_char format of its key ('2024-05', '2024')
+PERIODS = {'month': 'YYYY-MM', 'year': 'YYYY'}
+
+def flight_columns(cursor):
+    """The FLIGHT_JSON_KEYS columns this database's flights table has"""
+    cursor.execute("""
+        SELECT column_name FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'flights'
+    """)
+    existing = {row[0] for row in cursor.fetchall()}
+    return [column for column in FLIGHT_JSON_KEYS if column in existing]
+
+def shard_payloads(conn, period, columns, since_id=None):
+    """Yield (key, flight count, JSON text) per period, optionally only periods with ids above since_id"""
+    key = f"to_char(flight_date, '{PERIODS[period]}')"
+    fields = ', '.join(f"'{FLIGHT_JSON_KEYS[column]}', {column}" for column in columns)
+    touched = ''
+    params = ()
+    if since_id is not None:
+        touched = f"WHERE {key} IN (SELECT DISTINCT {key} FROM flights WHERE id > %s)"
+        params = (since_id,)
+    # A server-side cursor streams the shards instead of holding every period's JSON at once
+    cursor = conn.cursor(name=f"flight_shards_{period}")
+    cursor.itersize = 12
+    cursor.execute(f"""
+        SELECT {key}, COUNT(*), json_agg(json_build_object({fields}) ORDER BY flight_date, id)::text
+        FROM flights
+        {touched}
+        GROUP BY 1
+        ORDER BY 1
+    """, params)
+    try:
+        yield from cursor
+    finally:
+        cursor.close()
+
+def read_manifest(shard_dir):
+    """The shard manifest, or an empty one"""
+    path = os.path.join(shard_dir, MANIFEST)
+    if not os.path.exists(path):
+        return {'shards': {}}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+def write_file(path, data):
+    """Write bytes atomically so the server never serves a partial shard"""
+    with open(path + '.tmp', 'wb') as f:
+        f.write(data)
+    os.replace(path + '.tmp', path)
+
+def write_flight_shards(conn, shard_dir=SHARD_DIR, since_id=None):
+    """Write the month and year shards plus their manifest, skipping unchanged ones
+
+    Call once the import has committed; pass the pre-import id high-water
+    mark as since_id after an append-only load.
+    """
+    start = time.perf_counter()
+    os.makedirs(shard_dir, exist_ok=True)
+    manifest = read_manifest(shard_dir)
+    shards = manifest['shards']
+    written = unchanged = 0
+    total_bytes = 0
+
+    cursor = conn.cursor()
+    columns = flight_columns(cursor)
+    cursor.close()
+    seen = set()
+    try:
+        with stage('shards') as counts:
+            for period in PERIODS:
+                for key, flights, payload in shard_payloads(conn, period, columns, since_id):
+                    seen.add(key)
+                    data = payload.encode('utf-8')
+                    digest = hashlib.sha256(data).hexdigest()
+                    if shards.get(key, {}).get('sha256') == digest:
+                        unchanged += 1
+                        continue
+                    # mtime=0 keeps the gzip bytes a pure function of the JSON
+                    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+                    write_file(os.path.join(shard_dir, f"{key}.json.gz"), compressed)
+                    shards[key] = {
+                        'file': f"{key}.json.gz",
+                        'period': period,
+                        'flights': flights,
+                        'sha256': digest,
+                        'bytes': len(compressed),
+                    }
+                    written += 1
+                    total_bytes += len(compressed)
+            counts['rows'] = written
+            counts['bytes'] = total_bytes
+    finally:
+        # Ends the read-only transaction the server-side cursors ran in
+        conn.rollback()
+
+    # A full rebuild sees every period, so anything else no longer has flights
+    removed = []
+    if since_id is None:
+        removed = sorted(set(shards) - seen)
+        for key in removed:
+            path = os.path.join(shard_dir, shards.pop(key)['file'])
+            if os.path.exists(path):
+                os.remove(path)
+
+    manifest['generatedOn'] = datetime.now().isoformat()
+    write_file(os.path.join(shard_dir, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return {
+        'written': written,
+        'unchanged': unchanged,
+        'removed': len(removed),
+        'bytes': total_bytes,
+        'seconds': time.perf_counter() - start,
+    }
+
+def print_shard_stats(stats):
+    """Print a one-line report for write_flight_shards"""
+    print(f"Flight shards: {stats['written']} written ({stats['bytes'] / 1024:.0f} KB), "
+          f"{stats['unchanged']} unchanged, {stats['removed']} removed in {stats['seconds']:.2f}s")
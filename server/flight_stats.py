@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Pre-aggregated flight statistics.
+
+flight_stats holds one row per (dimension, key) -- e.g. ('month',
+'2024-05'), ('route', 'FAOR-FACT'), ('crew', 'J Smith') -- with flight
+counts, summed minute columns, distance and first/last flight dates, so
+dashboards read a few hundred rows instead of the whole logbook.
+
+After an append-only import only the keys touched by the new flights
+(id above the high-water mark taken before the load) are recomputed.
+Imports that replace or reconcile the logbook rebuild every dimension,
+which is one GROUP BY per dimension.
+"""
+import time
+
+from instrumentation import stage
+
+# Each dimension is a LATERAL source yielding the key(s) a flight counts towards
+DIMENSIONS = {
+    'year': "(VALUES (to_char(f.flight_date, 'YYYY')))",
+    'month': "(VALUES (to_char(f.flight_date, 'YYYY-MM')))",
+    'aircraft_type': "(VALUES (f.aircraft_type))",
+    'route': "(VALUES (f.from_airport || '-' || f.to_airport))",
+    'airport': "(SELECT DISTINCT k FROM unnest(ARRAY[f.from_airport, f.to_airport]) AS u(k))",
+    'crew': """(SELECT DISTINCT k FROM unnest(ARRAY[
+        f.selected_crew_pic, f.selected_crew_sic,
+        f.selected_crew_relief, f.selected_crew_student
+    ]) AS u(k))""",
+}
+
+STATS_COLUMNS = [
+    'dimension', 'key', 'flights', 'total_minutes', 'pic_minutes', 'sic_minutes',
+    'night_minutes', 'instrument_minutes', 'simulator_minutes', 'distance',
+    'first_flight', 'last_flight',
+]
+
+AGGREGATES = """
+    COUNT(*),
+    SUM(f.total_time_minutes), SUM(f.pic_minutes), SUM(f.sic_minutes),
+    SUM(f.night_minutes), SUM(f.actual_instrument_minutes), SUM(f.simulator_minutes),
+    SUM(f.distance), MIN(f.flight_date), MAX(f.flight_date)
+"""
+
+def ensure_stats_table(cursor):
+    """Create flight_stats if this database does not have it yet"""
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS flight_stats (
+            id serial PRIMARY KEY,
+            dimension text NOT NULL,
+            key text NOT NULL,
+            flights integer NOT NULL,
+            total_minutes integer,
+            pic_minutes integer,
+            sic_minutes integer,
+            night_minutes integer,
+            instrument_minutes integer,
+            simulator_minutes integer,
+            distance double precision,
+            first_flight date,
+            last_flight date,
+            refreshed_at timestamp NOT NULL DEFAULT now(),
+            UNIQUE (dimension, key)
+        )
+    """)
+
+def flights_high_water(conn):
+    """Highest flight id, taken before an append-only load"""
+    cursor = conn.cursor()
+    cursor.execute("SELECT COALESCE(MAX(id), 0) FROM flights")
+    high_water = cursor.fetchone()[0]
+    cursor.close()
+    return high_water
+
+def refresh_dimension(cursor, dimension, since_id=None):
+    """Recompute one dimension, or only its keys touched by flights above since_id"""
+    source = DIMENSIONS[dimension]
+    keys = f"""
+        FROM flights f CROSS JOIN LATERAL {source} AS keys(key)
+        WHERE keys.key IS NOT NULL AND keys.key <> ''
+    """
+    params = (dimension,)
+    if since_id is None:
+        cursor.execute("DELETE FROM flight_stats WHERE dimension = %s", params)
+        touched = ''
+    else:
+        touched = f"AND keys.key IN (SELECT keys.key {keys} AND f.id > %s)"
+        params = (dimension, since_id)
+        cursor.execute(f"""
+            DELETE FROM flight_stats
+            WHERE dimension = %s AND key IN (SELECT keys.key {keys} AND f.id > %s)
+        """, params)
+
+    cursor.execute(f"""
+        INSERT INTO flight_stats ({', '.join(STATS_COLUMNS)})
+        SELECT %s, keys.key, {AGGREGATES}
+        {keys} {touched}
+        GROUP BY keys.key
+    """, params)
+    return cursor.rowcount
+
+def refresh_flight_stats(conn, since_id=None):
+    """Refresh every dimension in one transaction, incrementally when since_id is given"""
+    start = time.perf_counter()
+    cursor = conn.cursor()
+    try:
+        with stage('stats') as counts:
+            ensure_stats_table(cursor)
+            rows = counts['rows'] = sum(refresh_dimension(cursor, dimension, since_id)
+                                        for dimension in DIMENSIONS)
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+    return {
+        'incremental': since_id is not None,
+        'rows': rows,
+        'seconds': time.perf_counter() - start,
+    }
+
+def print_stats_refresh(stats):
+    """Print a one-line report for refresh_flight_stats"""
+    mode = "incrementally" if stats['incremental'] else "fully"
+    print(f"Refreshed {stats['rows']} flight statistics rows {mode} in {stats['seconds']:.2f}s")
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+Vectorized great-circle distances for flights.
+
+Logbook distances are in nautical miles. Distances are computed with the
+haversine formula over whole arrays of from/to coordinates resolved from
+the airport reference, so filling or validating a full logbook is a
+handful of NumPy operations rather than a per-flight loop.
+"""
+import numpy as np
+import pandas as pd
+
+from airport_reference import airport_index
+
+EARTH_RADIUS_NM = 3440.065
+
+# A logged distance is suspicious when it is off by more than both of these;
+# such values are kept and reported rather than replaced
+MISMATCH_NM = 25.0
+MISMATCH_RATIO = 0.10
+
+# Polyline density for precomputed route paths
+PATH_SPACING_NM = 50.0
+MAX_PATH_POINTS = 64
+
+def haversine_nm(lat1, lon1, lat2, lon2):
+    """Great-circle distance in nautical miles between arrays of coordinates in degrees"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64))
+                              for a in (lat1, lon1, lat2, lon2))
+    a = (np.sin((lat2 - lat1) / 2.0) ** 2
+         + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2.0) ** 2)
+    return 2.0 * EARTH_RADIUS_NM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def route_distances(from_codes, to_codes, index=None):
+    """Great-circle distance for each from/to code pair (NaN where a code is unknown)"""
+    if index is None:
+        index = airport_index()
+    from_lat, from_lon = index.coordinates(from_codes)
+    to_lat, to_lon = index.coordinates(to_codes)
+    return haversine_nm(from_lat, from_lon, to_lat, to_lon)
+
+def table_coordinates(cursor):
+    """Coordinates stored in the airports table, keyed by code"""
+    cursor.execute("""
+        SELECT code, latitude, longitude FROM airports
+        WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+    """)
+    return {code: (lat, lon) for code, lat, lon in cursor.fetchall()}
+
+def resolve_coordinates(codes, fallback):
+    """Coordinates for codes from the reference, then from a code -> (lat, lon) fallback"""
+    latitude, longitude = airport_index().coordinates(codes)
+    missing = np.flatnonzero(np.isnan(latitude))
+    for i in missing:
+        coordinates = fallback.get(codes[i])
+        if coordinates:
+            latitude[i], longitude[i] = coordinates
+    return latitude, longitude
+
+def great_circle_path(lat1, lon1, lat2, lon2, spacing_nm=PATH_SPACING_NM, max_points=MAX_PATH_POINTS):
+    """Points along the great circle between two positions as an (n, 2) lat/lon array
+
+    Roughly one point every spacing_nm, with both endpoints included, so a
+    map can draw the route as a plain polyline without geodesic maths.
+    Longitude steps are normalised into [-180, 180], so a route across the
+    antimeridian continues past +/-180 instead of jumping across the map.
+    """
+    lat1, lon1, lat2, lon2 = np.radians([lat1, lon1, lat2, lon2])
+    start = np.array([np.cos(lat1) * np.cos(lon1), np.cos(lat1) * np.sin(lon1), np.sin(lat1)])
+    end = np.array([np.cos(lat2) * np.cos(lon2), np.cos(lat2) * np.sin(lon2), np.sin(lat2)])
+    angle = np.arccos(np.clip(start @ end, -1.0, 1.0))
+    points = int(np.clip(np.ceil(angle * EARTH_RADIUS_NM / spacing_nm) + 1, 2, max_points))
+    if angle < 1e-9:
+        return np.degrees([[lat1, lon1], [lat2, lon2]])
+
+    # Spherical linear interpolation between the two unit vectors
+    fraction = np.linspace(0.0, 1.0, points)[:, None]
+    vectors = (np.sin((1.0 - fraction) * angle) * start
+               + np.sin(fraction * angle) * end) / np.sin(angle)
+    latitude = np.arctan2(vectors[:, 2], np.hypot(vectors[:, 0], vectors[:, 1]))
+    longitude = np.unwrap(np.arctan2(vectors[:, 1], vectors[:, 0]))
+    return np.degrees(np.column_stack([latitude, longitude]))
+
+def distance_mismatches(logged, computed):
+    """Boolean mask of logged distances that disagree with the computed ones"""
+    logged = np.asarray(logged, dtype=np.float64)
+    computed = np.asarray(computed, dtype=np.float64)
+    difference = np.abs(logged - computed)
+    with np.errstate(invalid='ignore'):
+        return ((difference > MISMATCH_NM)
+                & (difference > MISMATCH_RATIO * computed)
+                & ~np.isnan(logged) & ~np.isnan(computed))
+
+def fill_distances(flights, overwrite=False, index=None):
+    """Fill (or, with overwrite, replace) the distance column of a cleaned flights frame
+
+    overwrite only replaces logged distances within the mismatch
+    tolerance of the great circle: one that disagrees by more is more
+    likely a routing the great circle doesn't know about (or a wrong
+    reference position) than a typo, so it is kept and counted instead.
+    Returns the updated frame and counters: filled, mismatched (logged
+    distances kept although they disagree) and unresolved (no
+    coordinates for one of the airports).
+    """
+    computed = route_distances(flights['from_airport'].to_numpy(),
+                               flights['to_airport'].to_numpy(), index)
+    logged = flights['distance'].to_numpy(dtype=np.float64, na_value=np.nan)
+    resolved = ~np.isnan(computed)
+    mismatched = distance_mismatches(logged, computed)
+
+    if overwrite:
+        replace = resolved & ~mismatched
+    else:
+        replace = np.isnan(logged) & resolved
+
+    flights = flights.copy()
+    flights['distance'] = pd.Series(np.where(replace, np.round(computed, 1), logged),
+                                    index=flights.index)
+    stats = {
+        'filled': int(replace.sum()),
+        'mismatched': int(mismatched.sum()),
+        'unresolved': int((~resolved).sum()),
+    }
+    return flights, stats
+
+def print_distance_stats(stats):
+    """Print the counters returned by fill_distances"""
+    print(f"Distances: {stats['filled']} filled from great circle, "
+          f"{stats['mismatched']} disagreeing logged values kept, "
+          f"{stats['unresolved']} routes without coordinates")
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+"""
+Parallel import of several logbook files at once.
+
+Logbooks (one per pilot or per year) are parsed and cleaned in a process
+pool; the cleaned frames go through a bounded queue to a small pool of
+writer threads, each with its own database connection, which bulk load
+them with COPY. With --async the same pipeline runs on an asyncio event
+loop (see async_runner.py). Usage:
+
+    python import-logbooks.py ../attached_assets/logbooks/ --workers 4 --writers 2
+    python import-logbooks.py '../attached_assets/Logbook_*.xlsx' --replace
+    python import-logbooks.py ../attached_assets/logbooks/ --async
+"""
+import argparse
+import asyncio
+import glob
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+from bulk_load import load_airports, load_flights_frame, load_stats, print_load_stats
+from airport_reference import airport_record
+from async_runner import parse_and_load
+from database import close_pool, connection_pool, pooled_connection
+from flight_indexes import build_flight_indexes, defer_flight_indexes, print_index_stats
+from flight_shards import print_shard_stats, write_flight_shards
+from flight_stats import flights_high_water, print_stats_refresh, refresh_flight_stats
+from logbook_cache import clear_cache, load_clean_logbook
+from logbook_clean import airport_codes, print_skipped
+
+LOGBOOK_PATTERNS = ('*.xlsx', '*.xlsm')
+
+def find_logbooks(sources):
+    """Expand directories and glob patterns into a sorted list of logbook files"""
+    paths = set()
+    for source in sources:
+        if os.path.isdir(source):
+            for pattern in LOGBOOK_PATTERNS:
+                paths.update(glob.glob(os.path.join(source, pattern)))
+        else:
+            paths.update(glob.glob(source))
+    # Skip Excel lock files left by open workbooks
+    return sorted(path for path in paths if not os.path.basename(path).startswith('~$'))
+
+def parse_logbook(path, use_cache=True):
+    """Read and clean one logbook (runs in a worker process)"""
+    flights, skipped, rows = load_clean_logbook(path, use_cache=use_cache)
+    return path, flights, skipped, rows
+
+def load_logbook(path, flights):
+    """Bulk load one cleaned logbook and its airports on a pooled connection"""
+    with pooled_connection() as conn:
+        airports = [airport_record(code) for code in airport_codes(flights)]
+        load_airports(conn, airports)
+        stats = load_flights_frame(conn, flights)
+    print(f"Loaded {stats['rows']} flights from {os.path.basename(path)} "
+          f"({stats['rows_per_sec']:,.0f} rows/sec)")
+    return stats
+
+def prepare_flights(replace):
+    """Clear flights for a --replace import, otherwise return the id high-water mark
+
+    The mark lets the summary refresh afterwards touch only the keys of
+    the appended flights. A --replace import returns the index definitions
+    deferred until the load is done instead.
+    """
+    with pooled_connection() as conn:
+        if not replace:
+            return flights_high_water(conn)
+        print("Clearing existing flight data...")
+        cursor = conn.cursor()
+        cursor.execute("DELETE FROM flights")
+        conn.commit()
+        cursor.close()
+        return defer_flight_indexes(conn)
+
+def rebuild_flight_indexes(replace, prepared):
+    """Build the indexes a --replace import deferred; runs even when the load fails"""
+    if replace:
+        print_index_stats(build_flight_indexes(prepared))
+
+def finish_flights(replace, prepared):
+    """Refresh the flight summaries after the load"""
+    with pooled_connection() as conn:
+        print_stats_refresh(refresh_flight_stats(conn, None if replace else prepared))
+        print_shard_stats(write_flight_shards(conn, since_id=None if replace else prepared))
+
+def writer(batches, totals, lock):
+    """Consume cleaned frames from the queue and bulk load them on pooled connections"""
+    while True:
+        item = batches.get()
+        if item is None:
+            break
+        path, flights = item
+        try:
+            stats = load_logbook(path, flights)
+            with lock:
+                totals['flights'] += stats['rows']
+        except Exception as e:
+            with lock:
+                totals['failed_files'] += 1
+            print(f"Error loading {path}: {e}")
+
+def import_logbooks(paths, workers, writers, queue_size, replace=False, use_cache=True):
+    """Parse logbooks in a process pool and load them through writer threads"""
+    start = time.perf_counter()
+
+    try:
+        # One pooled connection per writer, reused for every file it loads
+        connection_pool(writers)
+    except Exception as e:
+        print(f"Database connection error: {e}")
+        return False
+
+    prepared = prepare_flights(replace)
+
+    batches = queue.Queue(maxsize=queue_size)
+    totals = {'flights': 0, 'rows': 0, 'failed_files': 0}
+    skipped_total = {}
+    lock = threading.Lock()
+
+    threads = [
+        threading.Thread(target=writer, args=(batches, totals, lock), daemon=True)
+        for _ in range(writers)
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {pool.submit(parse_logbook, path, use_cache): path for path in paths}
+            for future in as_completed(futures):
+                try:
+                    path, flights, skipped, rows = future.result()
+                except Exception as e:
+                    print(f"Error parsing {futures[future]}: {e}")
+                    totals['failed_files'] += 1
+                    continue
+                totals['rows'] += rows
+                for reason, count in skipped.items():
+                    skipped_total[reason] = skipped_total.get(reason, 0) + count
+                print(f"Parsed {os.path.basename(path)}: {len(flights)} flights")
+                # Blocks while the writers are behind, bounding memory
+                batches.put((path, flights))
+    finally:
+        # Lets the writers finish (and commit or roll back) before the index builds need their locks
+        for _ in threads:
+            batches.put(None)
+        for thread in threads:
+            thread.join()
+        rebuild_flight_indexes(replace, prepared)
+    finish_flights(replace, prepared)
+    close_pool()
+
+    stats = load_stats(totals['flights'], start)
+    print_load_stats("flights overall", stats)
+    print(f"Read {totals['rows']} logbook rows from {len(paths)} files")
+    print_skipped(skipped_total)
+    if totals['failed_files']:
+        print(f"{totals['failed_files']} files failed")
+    return totals['failed_files'] == 0
+
+async def import_logbooks_async(paths, workers, writers, queue_size, replace=False, use_cache=True):
+    """Parse logbooks in a process pool and load them concurrently from an asyncio event loop"""
+    start = time.perf_counter()
+
+    try:
+        connection_pool(writers)
+    except Exception as e:
+        print(f"Database connection error: {e}")
+        return False
+
+    prepared = await asyncio.to_thread(prepare_flights, replace)
+
+    parsed_rows = {}
+    skipped_total = {}
+    lock = threading.Lock()
+
+    def load(path, parsed):
+        _, flights, skipped, rows = parsed
+        with lock:
+            parsed_rows[path] = rows
+            for reason, count in skipped.items():
+                skipped_total[reason] = skipped_total.get(reason, 0) + count
+        return load_logbook(path, flights)
+
+    try:
+        loaded, failures = await parse_and_load(
+            paths, partial(parse_logbook, use_cache=use_cache), load,
+            parsers=workers, loaders=writers, queue_size=queue_size
+        )
+    finally:
+        await asyncio.to_thread(rebuild_flight_indexes, replace, prepared)
+    await asyncio.to_thread(finish_flights, replace, prepared)
+    close_pool()
+
+    stats = load_stats(sum(result['rows'] for _, result in loaded), start)
+    print_load_stats("flights overall", stats)
+    print(f"Read {sum(parsed_rows.values())} logbook rows from {len(paths)} files")
+    print_skipped(skipped_total)
+    if failures:
+        print(f"{len(failures)} files failed")
+    return not failures
+
+def main():
+    parser = argparse.ArgumentParser(description="Import several logbook files in parallel")
+    parser.add_argument('sources', nargs='+',
+                        help="logbook files, directories or glob patterns")
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                        help="parser processes (default: CPU count)")
+    parser.add_argument('--writers', type=int, default=2,
+                        help="database writer connections (default: 2)")
+    parser.add_argument('--queue-size', type=int, default=4,
+                        help="cleaned logbooks held waiting for a writer (default: 4)")
+    parser.add_argument('--replace', action='store_true',
+                        help="delete all flights before importing")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always re-parse the workbooks instead of using the logbook cache")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="delete every cached logbook first, e.g. to reclaim disk space")
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help="drive parsing and loading from an asyncio event loop")
+    args = parser.parse_args()
+
+    if args.clear_cache:
+        print(f"Cleared {clear_cache()} logbook cache files")
+
+    paths = find_logbooks(args.sources)
+    if not paths:
+        print("No logbook files found")
+        return 1
+
+    print(f"Importing {len(paths)} logbooks with {args.workers} parsers "
+          f"and {args.writers} writers...")
+    if args.use_async:
+        success = asyncio.run(import_logbooks_async(paths, args.workers, args.writers, args.queue_size,
+                                                    args.replace, use_cache=not args.no_cache))
+    else:
+        success = import_logbooks(paths, args.workers, args.writers, args.queue_size,
+                                  args.replace, use_cache=not args.no_cache)
+    return 0 if success else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
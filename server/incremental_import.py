@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Incremental (idempotent) logbook re-import.
+
+Every cleaned logbook row gets a natural key (date, flight number, from,
+to, departure time, aircraft ID) and a content hash. A re-import stages
+the whole logbook, then inserts new keys, updates rows whose hash changed
+and deletes keys that disappeared, leaving everything else untouched.
+Airports are only ever added, so existing coordinates survive.
+"""
+import hashlib
+import time
+
+from bulk_load import (DERIVED_COLUMN_TYPES, FLIGHT_COLUMNS, copy_frame,
+                       create_staging_table, ensure_columns)
+from flight_partitions import ensure_year_partitions
+from instrumentation import stage
+
+KEY_COLUMNS = [
+    'flight_date', 'flight_number', 'from_airport', 'to_airport',
+    'actual_departure_time', 'aircraft_id',
+]
+
+SYNC_COLUMNS = FLIGHT_COLUMNS + ['row_key', 'row_hash']
+
+def ensure_sync_columns(conn):
+    """Add the row_key/row_hash and derived columns and the key index if they are missing"""
+    cursor = conn.cursor()
+    ensure_columns(cursor, 'flights', dict(DERIVED_COLUMN_TYPES, row_key='text', row_hash='text'))
+    cursor.execute("CREATE INDEX IF NOT EXISTS flights_row_key_idx ON flights (row_key)")
+    conn.commit()
+    cursor.close()
+
+def joined_text(flights, columns):
+    """Concatenate columns into one separator-joined string per row"""
+    def as_text(column):
+        values = flights[column]
+        if column == 'flight_date':
+            values = values.dt.strftime('%Y-%m-%d')
+        return values.astype('string').fillna('')
+
+    joined = as_text(columns[0])
+    for column in columns[1:]:
+        joined = joined + '\x1f' + as_text(column)
+    return joined
+
+def md5_hex(values):
+    """md5 hex digest of every string in a Series"""
+    return [hashlib.md5(value.encode('utf-8')).hexdigest() for value in values]
+
+def add_row_keys(flights, seen=None):
+    """Return a copy of a cleaned flights frame with row_key and row_hash columns
+
+    Rows sharing a natural key (e.g. two legs logged identically) are told
+    apart by their occurrence number within the logbook. Pass the same
+    seen dict for every chunk of one logbook so numbering carries across
+    chunks.
+    """
+    if seen is None:
+        seen = {}
+    flights = flights.copy()
+    natural = joined_text(flights, KEY_COLUMNS)
+    occurrence = natural.groupby(natural).cumcount()
+    if seen:
+        occurrence = occurrence + natural.map(seen).fillna(0).astype(int)
+    for key, count in natural.value_counts().items():
+        seen[key] = seen.get(key, 0) + count
+    flights['row_key'] = md5_hex(natural + '\x1f' + occurrence.astype('string'))
+    flights['row_hash'] = md5_hex(joined_text(flights, FLIGHT_COLUMNS))
+    return flights
+
+def backfill_row_keys(cursor, staging):
+    """Give unkeyed flights the row_key of the staged row with the same natural key
+
+    The nth unkeyed flight (by id) sharing a natural key is paired with the
+    nth staged row of that key not yet in flights. row_hash is copied only
+    when the two rows are identical, so changed rows still get updated.
+    Returns the number of flights keyed.
+    """
+    cursor.execute("SELECT EXISTS (SELECT 1 FROM flights WHERE row_key IS NULL)")
+    if not cursor.fetchone()[0]:
+        return 0
+    key_list = ', '.join(KEY_COLUMNS)
+    same_key = ' AND '.join(f"u.{column} IS NOT DISTINCT FROM s.{column}" for column in KEY_COLUMNS)
+    flight_row = ', '.join(f"f.{column}" for column in FLIGHT_COLUMNS)
+    staged_row = ', '.join(f"s.{column}" for column in FLIGHT_COLUMNS)
+    cursor.execute(f"""
+        WITH unkeyed AS (
+            SELECT id, {key_list}, row_number() OVER (PARTITION BY {key_list} ORDER BY id) AS occurrence
+            FROM flights WHERE row_key IS NULL
+        ), unmatched AS (
+            SELECT *, row_number() OVER (PARTITION BY {key_list} ORDER BY row_key) AS occurrence
+            FROM {staging} s
+            WHERE NOT EXISTS (SELECT 1 FROM flights f WHERE f.row_key = s.row_key)
+        ), pairs AS (
+            SELECT u.id, s.*
+            FROM unkeyed u JOIN unmatched s ON u.occurrence = s.occurrence AND {same_key}
+        )
+        UPDATE flights f
+        SET row_key = s.row_key,
+            row_hash = CASE WHEN ({flight_row}) IS NOT DISTINCT FROM ({staged_row})
+                            THEN s.row_hash END
+        FROM pairs s
+        WHERE f.id = s.id
+    """)
+    return cursor.rowcount
+
+def sync_flights(conn, frames):
+    """Reconcile flights with the cleaned frames of one complete logbook
+
+    frames is an iterable of cleaned flights frames (one frame, or the
+    chunks of a streaming read); each is COPYed into a staging table as it
+    arrives and the merge runs once at the end.
+
+    Flights loaded by the other importers have no row_key yet. Those rows
+    are first matched to logbook rows on the natural key columns, in id
+    order among rows sharing one, and take over that row's key. Their
+    row_hash is only set when every column already matches, so the first
+    sync after a plain import updates just the rows that really changed
+    and keeps every id; unmatched rows are deleted as usual.
+    """
+    start = time.perf_counter()
+    ensure_sync_columns(conn)
+    cursor = conn.cursor()
+    try:
+        staging = create_staging_table(cursor, 'flights', SYNC_COLUMNS)
+        staged = 0
+        seen = {}
+        for flights in frames:
+            with stage('load', rows=len(flights)):
+                staged += copy_frame(cursor, staging, add_row_keys(flights, seen)[SYNC_COLUMNS])
+        ensure_year_partitions(cursor, staging)
+
+        with stage('merge', rows=staged):
+            cursor.execute(f"CREATE INDEX ON {staging} (row_key)")
+            cursor.execute(f"ANALYZE {staging}")
+            keyed = backfill_row_keys(cursor, staging)
+
+            cursor.execute(f"""
+                DELETE FROM flights f
+                WHERE NOT EXISTS (SELECT 1 FROM {staging} s WHERE s.row_key = f.row_key)
+            """)
+            deleted = cursor.rowcount
+
+            assignments = ', '.join(f"{column} = s.{column}" for column in FLIGHT_COLUMNS)
+            cursor.execute(f"""
+                UPDATE flights f SET {assignments}, row_hash = s.row_hash
+                FROM {staging} s
+                WHERE f.row_key = s.row_key AND f.row_hash IS DISTINCT FROM s.row_hash
+            """)
+            updated = cursor.rowcount
+
+            column_list = ', '.join(SYNC_COLUMNS)
+            cursor.execute(f"""
+                INSERT INTO flights ({column_list})
+                SELECT {column_list} FROM {staging} s
+                WHERE NOT EXISTS (SELECT 1 FROM flights f WHERE f.row_key = s.row_key)
+            """)
+            inserted = cursor.rowcount
+        with stage('commit'):
+            conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor.close()
+
+    return {
+        'staged': staged,
+        'keyed': keyed,
+        'inserted': inserted,
+        'updated': updated,
+        'deleted': deleted,
+        'unchanged': staged - inserted - updated,
+        'seconds': time.perf_counter() - start,
+    }
+
+def print_sync_stats(stats):
+    """Print a one-line summary of a sync"""
+    if stats['keyed']:
+        print(f"Matched {stats['keyed']} flights from an earlier full import to logbook rows")
+    print(f"Synced {stats['staged']} logbook rows in {stats['seconds']:.2f}s: "
+          f"{stats['inserted']} inserted, {stats['updated']} updated, "
+          f"{stats['deleted']} deleted, {stats['unchanged']} unchanged")
@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Per-stage timing and profiling for the Python jobs.
+
+A job opens one run with instrumented_run(); library code marks its work
+with stage('read') / stage('load') / ... blocks, which record wall time,
+CPU time of the calling thread, rows and bytes into the active run.
+Stages with the same name accumulate, so per-chunk or per-table work
+adds up. With no active run, stage() only times the block and records
+nothing, so importing code outside a job costs nothing.
+
+At the end the run prints a summary table and, with --report, writes a
+JSON run report. --profile wraps the run in cProfile (main thread) and
+--trace-memory turns on tracemalloc, giving each stage the peak of
+Python allocations while it ran. The RSS figures come from getrusage and
+are the process high-water mark so far, not a per-stage number.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import resource
+import sys
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+
+class Run:
+    """Stage measurements of one job run"""
+
+    def __init__(self, job, profile=False, trace_memory=False):
+        self.job = job
+        self.status = 'ok'
+        self.report = None
+        self.stages = {}
+        self.lock = threading.Lock()
+        self.started_at = datetime.now()
+        self.start_wall = time.perf_counter()
+        self.start_cpu = time.process_time()
+        self.trace_memory = trace_memory
+        # Traced peak of every stage currently running, keyed by a token per stage call
+        self.open_peaks = {}
+        if trace_memory:
+            tracemalloc.start()
+        self.profiler = cProfile.Profile() if profile else None
+        if self.profiler:
+            self.profiler.enable()
+
+    def fold_traced_peak(self):
+        """Credit the traced peak since the last stage boundary to every open stage, then reset it
+
+        tracemalloc has one process-wide peak, so it is reset at each stage
+        start and end; nested and concurrent stages still see the highest
+        peak of any interval they were open for.
+        """
+        peak = tracemalloc.get_traced_memory()[1]
+        for token, open_peak in self.open_peaks.items():
+            self.open_peaks[token] = max(open_peak, peak)
+        tracemalloc.reset_peak()
+
+    def begin(self):
+        """Start tracking the traced peak of a stage call, returning its token"""
+        if not self.trace_memory:
+            return None
+        token = object()
+        with self.lock:
+            self.fold_traced_peak()
+            self.open_peaks[token] = tracemalloc.get_traced_memory()[0]
+        return token
+
+    def record(self, name, wall, cpu, rows, nbytes, token=None):
+        """Fold one stage measurement into the accumulated stage"""
+        with self.lock:
+            traced = None
+            if token is not None:
+                self.fold_traced_peak()
+                traced = self.open_peaks.pop(token)
+            entry = self.stages.setdefault(name, {
+                'name': name, 'calls': 0, 'wall_seconds': 0.0, 'cpu_seconds': 0.0,
+                'rows': 0, 'bytes': 0, 'process_peak_rss_mb': 0.0, 'peak_traced_mb': None,
+            })
+            entry['calls'] += 1
+            entry['wall_seconds'] += wall
+            entry['cpu_seconds'] += cpu
+            entry['rows'] += rows or 0
+            entry['bytes'] += nbytes or 0
+            # Process-wide high-water mark when the stage finished
+            entry['process_peak_rss_mb'] = max(entry['process_peak_rss_mb'], peak_rss_mb())
+            if traced is not None:
+                entry['peak_traced_mb'] = max(entry['peak_traced_mb'] or 0.0, traced / 1048576)
+
+    def finish(self, report_path=None):
+        """Stop profiling and tracing and build (and optionally write) the run report"""
+        if report_path:
+            os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+        profile_path = None
+        if self.profiler:
+            self.profiler.disable()
+            profile_path = (os.path.splitext(report_path)[0] if report_path else self.job) + '.prof'
+            self.profiler.dump_stats(profile_path)
+        if self.trace_memory:
+            tracemalloc.stop()
+
+        wall = time.perf_counter() - self.start_wall
+        stages = []
+        for entry in self.stages.values():
+            entry = dict(entry)
+            seconds = entry['wall_seconds']
+            entry['rows_per_sec'] = round(entry['rows'] / seconds) if seconds > 0 and entry['rows'] else None
+            for key in ('wall_seconds', 'cpu_seconds', 'process_peak_rss_mb', 'peak_traced_mb'):
+                if entry[key] is not None:
+                    entry[key] = round(entry[key], 4)
+            stages.append(entry)
+
+        report = {
+            'job': self.job,
+            'argv': sys.argv,
+            'status': self.status,
+            'started_at': self.started_at.isoformat(),
+            'finished_at': datetime.now().isoformat(),
+            'wall_seconds': round(wall, 4),
+            'cpu_seconds': round(time.process_time() - self.start_cpu, 4),
+            'process_peak_rss_mb': round(peak_rss_mb(), 1),
+            'profile': profile_path,
+            'stages': stages,
+        }
+        if report_path:
+            with open(report_path, 'w', encoding='utf-8') as f:
+                json.dump(report, f, indent=2)
+        return report
+
+def peak_rss_mb():
+    """Process high-water resident set size in MB"""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return peak / (1048576 if sys.platform == 'darwin' else 1024)
+
+_active = None
+
+def active_run():
+    """The run stages are recorded into, or None"""
+    return _active
+
+@contextmanager
+def stage(name, rows=None, nbytes=None):
+    """Measure a block as part of stage name in the active run
+
+    Yields a dict whose 'rows' and 'bytes' keys the block may set once it
+    knows how much it processed.
+    """
+    counts = {'rows': rows, 'bytes': nbytes}
+    run = _active
+    token = run.begin() if run is not None else None
+    start_wall = time.perf_counter()
+    start_cpu = time.thread_time()
+    try:
+        yield counts
+    finally:
+        if run is not None:
+            run.record(name, time.perf_counter() - start_wall, time.thread_time() - start_cpu,
+                       counts['rows'], counts['bytes'], token)
+
+def print_run_summary(report):
+    """Print the stage table of a run report"""
+    print(f"\n{report['job']} run: {report['wall_seconds']:.2f}s wall, "
+          f"{report['cpu_seconds']:.2f}s CPU, process peak RSS {report['process_peak_rss_mb']:.0f} MB")
+    if report['stages']:
+        traced = any(entry['peak_traced_mb'] is not None for entry in report['stages'])
+        print(f"  {'stage':<28}{'calls':>6}{'wall':>10}{'cpu':>10}{'rows':>11}{'MB':>9}"
+              + (f"{'traced MB':>11}" if traced else ''))
+        for entry in report['stages']:
+            print(f"  {entry['name']:<28}{entry['calls']:>6}{entry['wall_seconds']:>9.2f}s"
+                  f"{entry['cpu_seconds']:>9.2f}s{entry['rows']:>11,}{entry['bytes'] / 1048576:>9.1f}"
+                  + (f"{entry['peak_traced_mb'] or 0.0:>11.1f}" if traced else ''))
+    if report['profile']:
+        stats = io.StringIO()
+        pstats.Stats(report['profile'], stream=stats).sort_stats('cumulative').print_stats(15)
+        print(stats.getvalue())
+        print(f"Profile written to {report['profile']}")
+
+def add_instrumentation_arguments(parser):
+    """Add the shared --report / --profile / --trace-memory flags to a job's parser"""
+    parser.add_argument('--report', metavar='PATH',
+                        help="write a JSON run report with per-stage timings")
+    parser.add_argument('--profile', action='store_true',
+                        help="run under cProfile and print the hottest functions")
+    parser.add_argument('--trace-memory', action='store_true',
+                        help="track Python allocations with tracemalloc (slower)")
+
+@contextmanager
+def instrumented_run(job, args=None, summary=True):
+    """Make a Run active for the duration of a job, then report on it
+
+    args is the job's parsed arguments (see add_instrumentation_arguments).
+    Set run.status = 'failed' for failures that do not raise. The report is
+    left in run.report; summary=False skips printing it.
+    """
+    global _active
+    run = Run(job,
+              profile=getattr(args, 'profile', False),
+              trace_memory=getattr(args, 'trace_memory', False))
+    _active = run
+    try:
+        yield run
+    except BaseException:
+        run.status = 'failed'
+        raise
+    finally:
+        _active = None
+        report = run.report = run.finish(getattr(args, 'report', None))
+        if summary:
+            print_run_summary(report)
+        if report['status'] != 'ok':
+            print(f"Run status: {report['status']}")
@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+"""
+On-disk cache of cleaned logbooks keyed by file hash.
+
+Parsing the workbook with openpyxl is the slowest step of every import,
+so the cleaned, typed frame is stored next to a small JSON sidecar under
+a key made from the workbook's sha256 and the source of the cleaning
+rules. Editing either the workbook or logbook_clean.py invalidates the
+entry automatically, and --clear-cache on the importers empties the
+cache. Entries are Parquet files, written through pyarrow.
+"""
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+import logbook_clean
+from bulk_load import FLIGHT_COLUMNS
+from great_circle import fill_distances, print_distance_stats
+from instrumentation import stage
+from logbook_clean import clean_logbook
+
+CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.logbook-cache')
+
+def file_sha256(path, block_size=1 << 20):
+    """sha256 hex digest of a file, read in blocks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+def cleaning_rules_hash():
+    """Hash of the cleaning rules, so changing them invalidates the cache"""
+    digest = hashlib.sha256(file_sha256(logbook_clean.__file__).encode('ascii'))
+    digest.update(','.join(FLIGHT_COLUMNS).encode('ascii'))
+    return digest.hexdigest()[:16]
+
+def cache_key(path):
+    """Cache key for a workbook under the current cleaning rules"""
+    return f"{file_sha256(path)[:32]}-{cleaning_rules_hash()}"
+
+def cache_paths(key, cache_dir=CACHE_DIR):
+    """Data and sidecar paths for a cache key"""
+    base = os.path.join(cache_dir, key)
+    return f"{base}.parquet", f"{base}.json"
+
+def read_cached(key, cache_dir=CACHE_DIR):
+    """Return (flights, skipped, rows) for a cache key, or None on a miss"""
+    data_path, meta_path = cache_paths(key, cache_dir)
+    if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+        return None
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            meta = json.load(f)
+        flights = pd.read_parquet(data_path)
+    except Exception as e:
+        print(f"Ignoring unreadable logbook cache {data_path}: {e}")
+        return None
+    return flights, meta['skipped'], meta['rows']
+
+def write_cached(key, flights, skipped, rows, source, cache_dir=CACHE_DIR):
+    """Store a cleaned logbook under a cache key"""
+    os.makedirs(cache_dir, exist_ok=True)
+    data_path, meta_path = cache_paths(key, cache_dir)
+    # Write to temp names first so a crash never leaves a half-written entry
+    flights.to_parquet(data_path + '.tmp', index=False)
+    with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump({'source': os.path.abspath(source), 'skipped': skipped, 'rows': rows}, f)
+    os.replace(data_path + '.tmp', data_path)
+    os.replace(meta_path + '.tmp', meta_path)
+
+def load_clean_logbook(path, use_cache=True, cache_dir=CACHE_DIR, fill_distance=True):
+    """Read and clean a logbook, going through the cache when possible
+
+    Returns the cleaned flights frame, the skip counters and the number of
+    rows in the sheet. Missing distances are filled from the great circle
+    between the airports unless fill_distance is False; that step runs
+    after the cache so airport reference updates apply immediately.
+    """
+    flights, skipped, rows = read_clean_logbook(path, use_cache, cache_dir)
+    if fill_distance:
+        with stage('resolve', rows=len(flights)):
+            flights, distance_stats = fill_distances(flights)
+        print_distance_stats(distance_stats)
+    return flights, skipped, rows
+
+def read_clean_logbook(path, use_cache=True, cache_dir=CACHE_DIR):
+    """Cached read-and-clean step behind load_clean_logbook"""
+    key = cache_key(path) if use_cache else None
+    if key:
+        with stage('read cache') as counts:
+            cached = read_cached(key, cache_dir)
+            if cached is not None:
+                counts['rows'] = len(cached[0])
+        if cached is not None:
+            print(f"Using cached logbook for {os.path.basename(path)}")
+            return cached
+
+    with stage('read', nbytes=os.path.getsize(path)) as counts:
+        df = pd.read_excel(path)
+        counts['rows'] = len(df)
+    with stage('clean', rows=len(df)):
+        flights, skipped = clean_logbook(df)
+
+    if key:
+        try:
+            write_cached(key, flights, skipped, len(df), path, cache_dir)
+        except Exception as e:
+            print(f"Could not cache logbook {path}: {e}")
+    return flights, skipped, len(df)
+
+def clear_cache(cache_dir=CACHE_DIR):
+    """Remove every cached logbook, returning how many files were deleted"""
+    if not os.path.isdir(cache_dir):
+        return 0
+    removed = 0
+    for name in os.listdir(cache_dir):
+        os.remove(os.path.join(cache_dir, name))
+        removed += 1
+    return removed
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Column-oriented cleaning stage for logbook spreadsheets.
+
+Turns the raw Excel frame (with its leading-space column names) into a
+frame whose columns match the flights table, working on whole columns
+instead of walking the sheet with df.iterrows().
+"""
+import numpy as np
+import pandas as pd
+
+from bulk_load import LOGBOOK_COLUMNS, MINUTE_COLUMNS
+
+# Logbook column (leading spaces stripped) -> flights column
+COLUMN_MAP = {
+    'flight_flightDate': 'flight_date',
+    'flight_flightNumber': 'flight_number',
+    'flight_from': 'from_airport',
+    'flight_to': 'to_airport',
+    'flight_selectedCrewPIC': 'selected_crew_pic',
+    'flight_selectedCrewSIC': 'selected_crew_sic',
+    'flight_selectedCrewRelief': 'selected_crew_relief',
+    'flight_selectedCrewStudent': 'selected_crew_student',
+    'flight_actualDepartureTime': 'actual_departure_time',
+    'flight_actualArrivalTime': 'actual_arrival_time',
+    'flight_distance': 'distance',
+    'flight_totalTime': 'total_time',
+    'flight_pic': 'pic',
+    'flight_sic': 'sic',
+    'flight_night': 'night',
+    'flight_actualInstrument': 'actual_instrument',
+    'flight_dualReceived': 'dual_received',
+    'flight_dualGiven': 'dual_given',
+    'flight_simulator': 'simulator',
+    'flight_picNight': 'pic_night',
+    'flight_sicNight': 'sic_night',
+    'flight_dualReceivedNight': 'dual_received_night',
+    'aircraft_aircraftID': 'aircraft_id',
+    'aircraftType_type': 'aircraft_type',
+    'aircraftType_make': 'aircraft_make',
+    'aircraftType_model': 'aircraft_model',
+    'aircraftType_selectedEngineType': 'engine_type',
+    'aircraftType_selectedCategory': 'category',
+    'aircraftType_selectedAircraftClass': 'aircraft_class',
+    'aircraftType_notes': 'notes',
+}
+
+# Numeric flights columns; everything else except flight_date is text
+FLOAT_COLUMNS = ['distance', 'dual_received', 'dual_given']
+INTEGER_COLUMNS = ['dual_received_night']
+
+def normalize_columns(df):
+    """Strip the leading spaces from logbook column names and map them to flights columns"""
+    df = df.rename(columns=lambda name: str(name).strip())
+    return df.rename(columns=COLUMN_MAP)
+
+def clean_text(series):
+    """Strip a column and turn blanks into nulls"""
+    text = series.astype('string').str.strip()
+    return text.mask(text == '')
+
+# "H:MM", "H:MM:SS" or "N days, H:MM:SS" (timedelta text)
+DURATION_PATTERN = r'^(?:(?P<days>\d+) days?,\s*)?(?P<hours>\d+):(?P<minutes>\d{1,2})(?::(?P<seconds>\d{1,2}(?:\.\d+)?))?$'
+
+def duration_minutes(series):
+    """Parse a column of "H:MM" or decimal-hour strings into whole minutes"""
+    text = series.astype('string')
+    parts = text.str.extract(DURATION_PATTERN)
+    days, hours, minutes, seconds = (pd.to_numeric(parts[name], errors='coerce')
+                                     for name in ('days', 'hours', 'minutes', 'seconds'))
+    clock = (days.fillna(0) * 1440 + hours * 60 + minutes + seconds.fillna(0) / 60)
+    decimal_hours = pd.to_numeric(text.where(parts['hours'].isna()), errors='coerce') * 60
+    total = clock.fillna(decimal_hours)
+    return np.round(total.astype('float64')).astype('Int64')
+
+def clean_date(series):
+    """Parse a whole date column, leaving unparseable values as NaT"""
+    parsed = pd.to_datetime(series, errors='coerce', format='mixed')
+    return parsed.dt.normalize()
+
+def clean_logbook(df):
+    """Clean a raw logbook frame into flights rows
+
+    Returns the cleaned frame (columns in FLIGHT_COLUMNS order, including
+    the numeric *_minutes columns parsed from the duration text) and a dict
+    counting the rows that were skipped and why.
+    """
+    df = normalize_columns(df)
+    clean = pd.DataFrame(index=df.index)
+
+    for column in LOGBOOK_COLUMNS:
+        if column in df.columns:
+            source = df[column]
+        else:
+            source = pd.Series(pd.NA, index=df.index, dtype=object)
+
+        if column == 'flight_date':
+            clean[column] = clean_date(source)
+        elif column in FLOAT_COLUMNS:
+            clean[column] = pd.to_numeric(source, errors='coerce')
+        elif column in INTEGER_COLUMNS:
+            values = pd.to_numeric(source, errors='coerce')
+            clean[column] = np.trunc(values).astype('Int64')
+        else:
+            clean[column] = clean_text(source)
+
+    for column, minutes_column in MINUTE_COLUMNS.items():
+        clean[minutes_column] = duration_minutes(clean[column])
+
+    clean['from_airport'] = clean['from_airport'].str.upper()
+    clean['to_airport'] = clean['to_airport'].str.upper()
+
+    missing_date = clean['flight_date'].isna()
+    missing_airport = ~missing_date & (clean['from_airport'].isna() | clean['to_airport'].isna())
+    skipped = {
+        'missing_date': int(missing_date.sum()),
+        'missing_airport': int(missing_airport.sum()),
+    }
+
+    clean = clean[~(missing_date | missing_airport)].reset_index(drop=True)
+    return clean, skipped
+
+def airport_codes(flights):
+    """Unique airport codes referenced by a cleaned flights frame"""
+    codes = pd.concat([flights['from_airport'], flights['to_airport']]).dropna().unique()
+    return sorted(codes)
+
+def print_skipped(skipped):
+    """Print the skip counters returned by clean_logbook"""
+    total = sum(skipped.values())
+    details = ', '.join(f"{count} {reason.replace('_', ' ')}" for reason, count in skipped.items())
+    print(f"Skipped {total} invalid records ({details})")
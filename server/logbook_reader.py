@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Streaming Excel reader for logbook spreadsheets.
+
+Walks the sheet with openpyxl in read-only mode and yields fixed-size
+DataFrame chunks holding only the columns mapped into flights, so memory
+stays flat regardless of logbook size and loading can start while the
+rest of the sheet is still being parsed.
+"""
+import time
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from bulk_load import load_airports, load_flights_frame, load_stats
+from great_circle import fill_distances
+from instrumentation import stage
+from logbook_clean import COLUMN_MAP, airport_codes, clean_logbook
+
+DEFAULT_CHUNK_SIZE = 5000
+
+def iter_logbook_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Yield raw logbook chunks as DataFrames with stripped column names"""
+    workbook = load_workbook(path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.worksheets[0]
+        rows = sheet.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            return
+
+        # Keep only the columns mapped into flights
+        names = [str(name).strip() if name is not None else '' for name in header]
+        wanted = [(index, name) for index, name in enumerate(names) if name in COLUMN_MAP]
+        if not wanted:
+            return
+        columns = [name for _, name in wanted]
+        last_column = max(index for index, _ in wanted) + 1
+
+        chunk = []
+        for row in rows:
+            if len(row) < last_column:
+                row = tuple(row) + (None,) * (last_column - len(row))
+            chunk.append([row[index] for index, _ in wanted])
+            if len(chunk) >= chunk_size:
+                yield pd.DataFrame(chunk, columns=columns)
+                chunk = []
+        if chunk:
+            yield pd.DataFrame(chunk, columns=columns)
+    finally:
+        workbook.close()
+
+def iter_clean_chunks(path, chunk_size=DEFAULT_CHUNK_SIZE, fill_distance=True):
+    """Yield (cleaned flights frame, skipped counters, raw row count) per chunk"""
+    chunks = iter_logbook_chunks(path, chunk_size)
+    while True:
+        with stage('read') as counts:
+            raw = next(chunks, None)
+            counts['rows'] = 0 if raw is None else len(raw)
+        if raw is None:
+            return
+        with stage('clean', rows=len(raw)):
+            flights, skipped = clean_logbook(raw)
+        if fill_distance:
+            with stage('resolve', rows=len(flights)):
+                flights, _ = fill_distances(flights)
+        yield flights, skipped, len(raw)
+
+def stream_import(conn, path, airport_record, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Stream a logbook into the database one chunk at a time
+
+    airport_record(code) builds the airport row for codes seen in a chunk.
+    Each chunk is committed as soon as it is cleaned. Returns the overall
+    load stats plus the accumulated skip counters.
+    """
+    start = time.perf_counter()
+    loaded = 0
+    read = 0
+    skipped_total = {}
+    seen_airports = set()
+
+    for number, (flights, skipped, raw_rows) in enumerate(iter_clean_chunks(path, chunk_size), 1):
+        read += raw_rows
+        for reason, count in skipped.items():
+            skipped_total[reason] = skipped_total.get(reason, 0) + count
+
+        new_codes = [code for code in airport_codes(flights) if code not in seen_airports]
+        if new_codes:
+            with stage('resolve', rows=len(new_codes)):
+                records = [airport_record(code) for code in new_codes]
+            load_airports(conn, records)
+            seen_airports.update(new_codes)
+
+        loaded += load_flights_frame(conn, flights)['rows']
+        print(f"Chunk {number}: {read} rows read, {loaded} flights loaded")
+
+    return load_stats(loaded, start), skipped_total
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Consistency checks over a cleaned logbook frame.
+
+Every check is a sort plus shifted-column comparisons over the whole
+frame, O(n log n), so a full logbook is validated in memory before any
+row reaches the database:
+
+- duplicate: a later row with the same natural key as an earlier one
+- arrival_before_departure / block_time_mismatch: the departure and
+  arrival clock times disagree with the logged total time
+- overlap: a block interval starting before an earlier one on the same
+  timeline has ended; timelines are the logbook itself (its owner flies
+  every leg), each aircraft and each named crew member
+- chain_break: a leg departing from somewhere other than where the
+  previous leg of the logbook arrived (a warning: positioning flights and
+  gaps in the logbook break the chain legitimately)
+
+Block intervals start at flight_date plus the departure clock time and
+last total_time_minutes; rows without a departure time are left out of
+the overlap sweep.
+"""
+import numpy as np
+import pandas as pd
+
+from incremental_import import KEY_COLUMNS
+from instrumentation import stage
+
+# Minutes the departure-to-arrival clock span may differ from the logged total
+BLOCK_TOLERANCE_MINUTES = 15
+
+CREW_COLUMNS = ['selected_crew_pic', 'selected_crew_sic', 'selected_crew_relief', 'selected_crew_student']
+
+SEVERITY = {
+    'duplicate': 'error',
+    'arrival_before_departure': 'error',
+    'block_time_mismatch': 'error',
+    'overlap': 'error',
+    'chain_break': 'warning',
+}
+
+REJECT_COLUMNS = ['row', 'check', 'severity', 'detail'] + KEY_COLUMNS
+
+def clock_minutes(series):
+    """Minutes after midnight of "HH:MM[:SS]" clock text, NaN when unparseable"""
+    parts = series.astype('string').str.extract(r'^\s*(\d{1,2}):(\d{2})')
+    minutes = pd.to_numeric(parts[0], errors='coerce') * 60 + pd.to_numeric(parts[1], errors='coerce')
+    return minutes.where(minutes < 1440).astype('float64')
+
+def clock_columns(flights):
+    """Departure and arrival clock times in minutes, parsed once for every check"""
+    return pd.DataFrame({
+        'departure': clock_minutes(flights['actual_departure_time']),
+        'arrival': clock_minutes(flights['actual_arrival_time']),
+    })
+
+def block_intervals(flights, clocks):
+    """Block start and end timestamps per row (NaT without a departure time)"""
+    departure, arrival = clocks['departure'], clocks['arrival']
+    duration = flights['total_time_minutes'].astype('float64')
+    duration = duration.fillna((arrival - departure) % 1440)
+    start = flights['flight_date'] + pd.to_timedelta(departure, unit='m')
+    end = start + pd.to_timedelta(duration, unit='m')
+    return start, end
+
+def rejects_frame(flights, rows, check, details):
+    """Reject records for the given row positions"""
+    rejects = flights.loc[rows, KEY_COLUMNS].copy()
+    rejects.insert(0, 'row', rows)
+    rejects.insert(1, 'check', check)
+    rejects.insert(2, 'severity', SEVERITY[check])
+    rejects.insert(3, 'detail', list(details))
+    return rejects
+
+def find_duplicates(flights, clocks):
+    """Rows repeating the natural key of an earlier row"""
+    first = flights.groupby(KEY_COLUMNS, dropna=False, sort=False).cumcount()
+    duplicated = first > 0
+    rows = np.flatnonzero(duplicated.to_numpy())
+    original = flights.reset_index().groupby(KEY_COLUMNS, dropna=False, sort=False)['index'].transform('first')
+    return rejects_frame(flights, rows, 'duplicate',
+                         (f"same key as row {value}" for value in original.to_numpy()[rows]))
+
+def find_block_time_errors(flights, clocks):
+    """Rows whose clock times do not add up to the logged total time"""
+    departure, arrival = clocks['departure'], clocks['arrival']
+    total = flights['total_time_minutes'].astype('float64')
+    span = (arrival - departure) % 1440
+    wrong = ((span - total).abs() > BLOCK_TOLERANCE_MINUTES).to_numpy()
+
+    # Arriving "earlier" is only fine when the flight crosses midnight
+    same_day = (departure + total < 1440).to_numpy()
+    backwards = wrong & same_day & (arrival < departure).to_numpy()
+    frames = []
+    for check, mask in (('arrival_before_departure', backwards), ('block_time_mismatch', wrong & ~backwards)):
+        rows = np.flatnonzero(mask)
+        frames.append(rejects_frame(flights, rows, check, (
+            f"departs {flights['actual_departure_time'].iat[row]}, arrives "
+            f"{flights['actual_arrival_time'].iat[row]}, logged {flights['total_time'].iat[row]}"
+            for row in rows)))
+    return pd.concat(frames)
+
+def sweep_overlaps(rows, timeline, start, end):
+    """Sort-and-sweep a set of timelines
+
+    Each interval is a frame row on a named timeline (one row may sit on
+    several, e.g. once per crew member). Returns (row, overlapped row,
+    timeline) for every interval starting before the latest end among the
+    earlier intervals of its timeline.
+    """
+    sweep = pd.DataFrame({'row': rows, 'timeline': timeline, 'start': start, 'end': end})
+    sweep = sweep.dropna(subset=['start', 'end'])
+    sweep = sweep.sort_values(['timeline', 'start'], kind='stable', ignore_index=True)
+    group = sweep.groupby('timeline', sort=False)
+    latest_end = group['end'].cummax()
+
+    # The interval holding the running maximum end is the one an overlap runs into
+    sweep['holder'] = sweep['row'].where(sweep['end'] == latest_end)
+    sweep['holder'] = group['holder'].ffill()
+    sweep['latest_end'] = latest_end
+    previous = group[['latest_end', 'holder']].shift()
+
+    overlapping = (sweep['start'] < previous['latest_end']).to_numpy()
+    return (sweep['row'].to_numpy()[overlapping],
+            previous['holder'].to_numpy()[overlapping].astype(int),
+            sweep['timeline'].to_numpy()[overlapping])
+
+def find_overlaps(flights, clocks):
+    """Rows whose block interval overlaps an earlier one on a shared timeline"""
+    start, end = block_intervals(flights, clocks)
+
+    # One interval per (row, timeline): the logbook, the aircraft and each crew member
+    crew = flights[CREW_COLUMNS].melt(ignore_index=False, value_name='crew')['crew'].dropna()
+    timeline = pd.concat([
+        pd.Series('logbook', index=flights.index, dtype='string'),
+        'aircraft ' + flights['aircraft_id'].dropna(),
+        'crew ' + crew,
+    ])
+    timeline = timeline[~pd.MultiIndex.from_arrays([timeline.index, timeline.to_numpy()]).duplicated()]
+    rows = timeline.index.to_numpy()
+    overlap_rows, overlapped, labels = sweep_overlaps(rows, timeline.to_numpy(dtype=object),
+                                                      start.to_numpy()[rows], end.to_numpy()[rows])
+
+    # Report each overlapping pair once, listing every timeline it clashes on
+    pairs = {}
+    for pair in sorted(zip(overlap_rows.tolist(), overlapped.tolist(), labels.tolist())):
+        pairs.setdefault(pair[:2], []).append(pair[2])
+    return rejects_frame(flights, np.array([row for row, _ in pairs], dtype=int), 'overlap', (
+        f"overlaps row {other} ({', '.join(timelines)})" for (_, other), timelines in pairs.items()))
+
+def find_chain_breaks(flights, clocks):
+    """Legs not departing from the previous leg's arrival airport, in logbook order"""
+    order = pd.DataFrame({'date': flights['flight_date'], 'departure': clocks['departure']}).sort_values(
+        ['date', 'departure'], kind='stable', na_position='last').index.to_numpy()
+    from_airport = flights['from_airport'].to_numpy()[order]
+    previous_to = flights['to_airport'].to_numpy()[order]
+    broken = np.flatnonzero(from_airport[1:] != previous_to[:-1]) + 1
+    rows = order[broken]
+    return rejects_frame(flights, rows, 'chain_break', (
+        f"previous leg (row {order[i - 1]}) arrived at {previous_to[i - 1]}" for i in broken))
+
+CHECKS = {
+    'duplicate': find_duplicates,
+    'block_time': find_block_time_errors,
+    'overlap': find_overlaps,
+    'chain_break': find_chain_breaks,
+}
+
+def validate_logbook(flights, checks=None):
+    """Run the checks over a cleaned flights frame, returning one reject row per finding"""
+    with stage('validate', rows=len(flights)):
+        clocks = clock_columns(flights)
+        frames = [CHECKS[name](flights, clocks) for name in (checks or CHECKS)]
+        rejects = pd.concat(frames, ignore_index=True)
+        return rejects.sort_values(['row', 'check'], kind='stable', ignore_index=True)[REJECT_COLUMNS]
+
+def print_validation_summary(rejects, flights):
+    """Print reject counts per check"""
+    print(f"Validated {len(flights)} flights: {rejects['row'].nunique()} rows with findings")
+    for check, count in rejects['check'].value_counts().sort_index().items():
+        print(f"  {count} {check.replace('_', ' ')} ({SEVERITY[check]})")
@@ -1,56 +1,83 @@
 #!/usr/bin/env python3
 
-import pandas as pd
-import psycopg2
-from psycopg2.extras import execute_batch
-import os
-from datetime import datetime
 import sys
+import argparse
+from database import connect_to_db
+from bulk_load import load_airports, load_flights_frame, print_load_stats, replace_flight_years
+from flight_indexes import deferred_flight_indexes, print_index_stats
+from flight_partitions import is_partitioned, print_partition_stats
+from flight_shards import print_shard_stats, write_flight_shards
+from flight_stats import print_stats_refresh, refresh_flight_stats
+from logbook_clean import airport_codes, print_skipped
+from logbook_cache import clear_cache, load_clean_logbook
+from airport_reference import airport_record
+from logbook_reader import DEFAULT_CHUNK_SIZE, iter_clean_chunks, stream_import
+from incremental_import import print_sync_stats, sync_flights
+from instrumentation import add_instrumentation_arguments, instrumented_run, stage
 
-def connect_to_db():
-    """Connect to PostgreSQL database using environment variables"""
-    try:
-        conn = psycopg2.connect(
-            host=os.getenv('PGHOST'),
-            database=os.getenv('PGDATABASE'),
-            user=os.getenv('PGUSER'),
-            password=os.getenv('PGPASSWORD'),
-            port=os.getenv('PGPORT')
-        )
-        return conn
-    except Exception as e:
-        print(f"Database connection error: {e}")
-        return None
-
-def safe_str(value):
-    """Safely convert value to string, handling NaN and None"""
-    if pd.isna(value) or value is None:
-        return None
-    return str(value).strip() if str(value).strip() else None
+LOGBOOK_PATH = '../attached_assets/Logbook_All_TabV1_Cleaned_1750015246968.xlsx'
 
-def parse_date(date_value):
-    """Parse date from various formats"""
-    if pd.isna(date_value):
-        return None
+def incremental_import_flights(conn, stream, chunk_size, use_cache):
+    """Reconcile flights with the logbook without clearing either table"""
+    airports = set()
+    skipped_total = {}
     
-    try:
-        if isinstance(date_value, str):
-            # Try different date formats
-            for fmt in ['%Y-%m-%d', '%m/%d/%Y', '%d/%m/%Y']:
-                try:
-                    return datetime.strptime(date_value.strip(), fmt).strftime('%Y-%m-%d')
-                except ValueError:
-                    continue
+    def cleaned_frames():
+        if stream:
+            chunks = iter_clean_chunks(LOGBOOK_PATH, chunk_size)
         else:
-            # Handle pandas timestamp
-            return date_value.strftime('%Y-%m-%d')
-    except:
-        pass
+            chunks = [load_clean_logbook(LOGBOOK_PATH, use_cache=use_cache)]
+        for flights, skipped, _ in chunks:
+            for reason, count in skipped.items():
+                skipped_total[reason] = skipped_total.get(reason, 0) + count
+            airports.update(airport_codes(flights))
+            yield flights
+    
+    print_sync_stats(sync_flights(conn, cleaned_frames()))
+    
+    # Updated and deleted rows can move any total, so rebuild the summaries
+    print_stats_refresh(refresh_flight_stats(conn))
+    print_shard_stats(write_flight_shards(conn))
     
-    return None
+    # New airports only; existing rows and their coordinates are left alone
+    with stage('resolve', rows=len(airports)):
+        airport_data = [airport_record(code) for code in sorted(airports)]
+    print_load_stats("airports", load_airports(conn, airport_data))
+    print_skipped(skipped_total)
 
-def optimized_import_flights():
-    """Import flight data with optimized batch processing"""
+def partitioned_import_flights(conn, years, use_cache):
+    """Swap freshly loaded year partitions in instead of deleting and reinserting rows"""
+    print("Reading Excel file...")
+    flights, skipped, total_rows = load_clean_logbook(LOGBOOK_PATH, use_cache=use_cache)
+    print(f"Found {total_rows} flight records")
+    if years:
+        flights = flights[flights['flight_date'].dt.year.isin(years)]
+    
+    stats = replace_flight_years(conn, flights, years)
+    print_load_stats("flights", stats)
+    print_partition_stats(stats)
+    
+    # New airports only, as other years still reference the existing ones
+    airports = airport_codes(flights)
+    with stage('resolve', rows=len(airports)):
+        airport_data = [airport_record(code) for code in airports]
+    print_load_stats("airports", load_airports(conn, airport_data))
+    print_skipped(skipped)
+    print_stats_refresh(refresh_flight_stats(conn))
+    print_shard_stats(write_flight_shards(conn))
+
+def optimized_import_flights(stream=False, chunk_size=DEFAULT_CHUNK_SIZE, incremental=False,
+                             use_cache=True, years=None):
+    """Import flight data with optimized batch processing
+
+    With stream=True the sheet is read and loaded in chunks instead of being
+    materialized with pd.read_excel first. With incremental=True only new,
+    changed and vanished logbook rows touch the database. Unless
+    use_cache=False, whole-sheet reads go through the parsed-logbook cache.
+    When flights is partitioned by year (see partition-flights.py) a
+    whole-sheet import swaps in new year partitions; years limits it to
+    replacing just those years.
+    """
     
     # Connect to database
     conn = connect_to_db()
@@ -58,114 +85,61 @@ def optimized_import_flights():
         return False
     
     try:
+        if incremental and years:
+            raise Exception("an incremental import always reconciles the whole logbook, so years can't be given")
+        if incremental:
+            print("Incrementally re-importing flight data...")
+            incremental_import_flights(conn, stream, chunk_size, use_cache)
+            return True
+        
         cursor = conn.cursor()
         
-        # Read Excel file
-        print("Reading Excel file...")
-        df = pd.read_excel('../attached_assets/Logbook_All_TabV1_Cleaned_1750015246968.xlsx')
-        total_rows = len(df)
-        print(f"Found {total_rows} flight records")
+        if years or (not stream and is_partitioned(cursor)):
+            print("Replacing year partitions of flight data...")
+            partitioned_import_flights(conn, years, use_cache)
+            return True
         
         # Clear existing data
         print("Clearing existing flight and airport data...")
-        cursor.execute("DELETE FROM flights")
-        cursor.execute("DELETE FROM airports")
-        conn.commit()
-        
-        # Prepare airport data
-        airports = set()
-        flight_data = []
-        
-        # Process flights in smaller batches
-        batch_size = 500
-        processed = 0
-        
-        for index, row in df.iterrows():
-            try:
-                # Parse flight date
-                flight_date = parse_date(row.get('flight_flightDate'))
-                if not flight_date:
-                    continue
-                
-                # Get airport codes
-                from_airport = safe_str(row.get(' flight_from'))
-                to_airport = safe_str(row.get(' flight_to'))
-                
-                if not from_airport or not to_airport:
-                    # Skip records without airport data for now
-                    continue
-                
-                # Add airports to set
-                airports.add(from_airport)
-                airports.add(to_airport)
-                
-                # Prepare flight record using actual column names
-                flight_record = (
-                    flight_date,
-                    safe_str(row.get(' flight_flightNumber')),
-                    from_airport,
-                    to_airport,
-                    safe_str(row.get(' flight_selectedCrewPIC')),
-                    safe_str(row.get(' flight_selectedCrewSIC')),
-                    safe_str(row.get(' flight_selectedCrewRelief')),
-                    safe_str(row.get(' flight_selectedCrewStudent')),
-                    safe_str(row.get(' flight_actualDepartureTime')),
-                    safe_str(row.get(' flight_actualArrivalTime')),
-                    float(row.get('flight_distance', 0)) if pd.notna(row.get('flight_distance')) else None,
-                    str(row.get(' flight_totalTime')) if pd.notna(row.get(' flight_totalTime')) else None,
-                    str(row.get(' flight_pic')) if pd.notna(row.get(' flight_pic')) else None,
-                    str(row.get(' flight_sic')) if pd.notna(row.get(' flight_sic')) else None,
-                    str(row.get(' flight_night')) if pd.notna(row.get(' flight_night')) else None,
-                    str(row.get(' flight_actualInstrument')) if pd.notna(row.get(' flight_actualInstrument')) else None,
-                    float(row.get(' flight_dualReceived', 0)) if pd.notna(row.get(' flight_dualReceived')) else None,
-                    float(row.get(' flight_dualGiven', 0)) if pd.notna(row.get(' flight_dualGiven')) else None,
-                    str(row.get(' flight_simulator')) if pd.notna(row.get(' flight_simulator')) else None,
-                    str(row.get(' flight_picNight')) if pd.notna(row.get(' flight_picNight')) else None,
-                    str(row.get(' flight_sicNight')) if pd.notna(row.get(' flight_sicNight')) else None,
-                    int(row.get(' flight_dualReceivedNight', 0)) if pd.notna(row.get(' flight_dualReceivedNight')) else None,
-                    safe_str(row.get(' aircraft_aircraftID')),
-                    safe_str(row.get(' aircraftType_type')),
-                    safe_str(row.get(' aircraftType_make')),
-                    safe_str(row.get(' aircraftType_model')),
-                    safe_str(row.get(' aircraftType_selectedEngineType')),
-                    safe_str(row.get(' aircraftType_selectedCategory')),
-                    safe_str(row.get(' aircraftType_selectedAircraftClass')),
-                    safe_str(row.get(' aircraftType_notes'))
-                )
-                
-                flight_data.append(flight_record)
-                processed += 1
-                
-                # Insert batch when we reach batch_size
-                if len(flight_data) >= batch_size:
-                    insert_flight_batch(cursor, flight_data)
-                    conn.commit()
-                    print(f"Processed {processed}/{total_rows} flights...")
-                    flight_data = []
-                
-            except Exception as e:
-                print(f"Error processing row {index}: {e}")
-                continue
-        
-        # Insert remaining flights
-        if flight_data:
-            insert_flight_batch(cursor, flight_data)
+        with stage('clear'):
+            cursor.execute("DELETE FROM flights")
+            cursor.execute("DELETE FROM airports")
             conn.commit()
         
-        # Insert airports
-        print(f"Inserting {len(airports)} unique airports...")
-        airport_data = [(code, f"Airport {code}", None, None, None, None) for code in airports]
-        
-        airport_query = """
-        INSERT INTO airports (code, name, city, country, latitude, longitude)
-        VALUES (%s, %s, %s, %s, %s, %s)
-        ON CONFLICT (code) DO NOTHING
-        """
+        if stream:
+            print(f"Streaming Excel file in chunks of {chunk_size} rows...")
+            with deferred_flight_indexes(conn) as index_stats:
+                flight_stats, skipped = stream_import(conn, LOGBOOK_PATH, airport_record, chunk_size)
+            print_load_stats("flights", flight_stats)
+            print(f"Successfully imported {flight_stats['rows']} flights")
+            print_skipped(skipped)
+            print_index_stats(index_stats)
+            print_stats_refresh(refresh_flight_stats(conn))
+            print_shard_stats(write_flight_shards(conn))
+            return True
         
-        execute_batch(cursor, airport_query, airport_data, page_size=100)
-        conn.commit()
+        with deferred_flight_indexes(conn) as index_stats:
+            # Read and clean the Excel file (cached by file hash)
+            print("Reading Excel file...")
+            flights, skipped, total_rows = load_clean_logbook(LOGBOOK_PATH, use_cache=use_cache)
+            print(f"Found {total_rows} flight records")
+            
+            # Bulk load flights
+            flight_stats = load_flights_frame(conn, flights)
+            print_load_stats("flights", flight_stats)
+            
+            # Insert airports
+            airports = airport_codes(flights)
+            print(f"Inserting {len(airports)} unique airports...")
+            with stage('resolve', rows=len(airports)):
+                airport_data = [airport_record(code) for code in airports]
+            print_load_stats("airports", load_airports(conn, airport_data))
         
-        print(f"Successfully imported {processed} flights and {len(airports)} airports")
+        print(f"Successfully imported {flight_stats['rows']} flights and {len(airports)} airports")
+        print_skipped(skipped)
+        print_index_stats(index_stats)
+        print_stats_refresh(refresh_flight_stats(conn))
+        print_shard_stats(write_flight_shards(conn))
         return True
         
     except Exception as e:
@@ -175,29 +149,35 @@ def optimized_import_flights():
         if conn:
             conn.close()
 
-def insert_flight_batch(cursor, flight_data):
-    """Insert a batch of flight records"""
-    flight_query = """
-    INSERT INTO flights (
-        flight_date, flight_number, from_airport, to_airport,
-        selected_crew_pic, selected_crew_sic, selected_crew_relief, selected_crew_student,
-        actual_departure_time, actual_arrival_time, distance, total_time,
-        pic, sic, night, actual_instrument, dual_received, dual_given,
-        simulator, pic_night, sic_night, dual_received_night,
-        aircraft_id, aircraft_type, aircraft_make, aircraft_model,
-        engine_type, category, aircraft_class, notes
-    ) VALUES (
-        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-        %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-    )
-    """
-    
-    execute_batch(cursor, flight_query, flight_data, page_size=100)
-
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import the flight logbook")
+    parser.add_argument('--stream', action='store_true',
+                        help="read and load the sheet in chunks to keep memory flat")
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help="rows per chunk in streaming mode")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only insert, update and delete the logbook rows that changed")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always re-parse the workbook instead of using the logbook cache")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="delete every cached logbook first, e.g. to reclaim disk space")
+    parser.add_argument('--years', type=int, nargs='+', metavar='YEAR',
+                        help="replace only these years of a year-partitioned flights table")
+    add_instrumentation_arguments(parser)
+    args = parser.parse_args()
+    if args.years and (args.stream or args.incremental):
+        parser.error("--years replaces whole partitions and can't be combined with --stream or --incremental")
+    
+    if args.clear_cache:
+        print(f"Cleared {clear_cache()} logbook cache files")
+    
     print("Starting optimized flight data import...")
-    success = optimized_import_flights()
+    with instrumented_run('optimized-flight-import', args) as run:
+        success = optimized_import_flights(stream=args.stream, chunk_size=args.chunk_size,
+                                           incremental=args.incremental, use_cache=not args.no_cache,
+                                           years=args.years)
+        if not success:
+            run.status = 'failed'
     if success:
         print("Import completed successfully!")
         sys.exit(0)
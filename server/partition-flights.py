@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Lay the flights table out as range partitions by flight_date year.
+
+A one-off conversion (see flight_partitions.py): the rows, id sequence
+and indexes carry over, and the app's queries are unchanged. Afterwards
+optimized-flight-import.py replaces whole years by swapping partitions
+and the other loaders create missing years on demand. Usage:
+
+    python partition-flights.py
+    python partition-flights.py --list
+"""
+import argparse
+import sys
+
+from database import connect_to_db
+from flight_indexes import print_index_stats
+from flight_partitions import is_partitioned, partition_flights
+
+def list_partitions(conn):
+    """Print every year partition with its row count"""
+    cursor = conn.cursor()
+    if not is_partitioned(cursor):
+        print("flights is not partitioned")
+        cursor.close()
+        return
+    cursor.execute("""
+        SELECT tableoid::regclass::text, COUNT(*), MIN(flight_date), MAX(flight_date)
+        FROM flights GROUP BY 1 ORDER BY 1
+    """)
+    for partition, rows, first, last in cursor.fetchall():
+        print(f"  {partition}: {rows:,} flights ({first} to {last})")
+    cursor.close()
+
+def convert_flights():
+    """Partition flights by year, returning True on success"""
+    conn = connect_to_db()
+    if not conn:
+        return False
+
+    try:
+        stats = partition_flights(conn)
+        if stats:
+            print(f"Partitioned {stats['rows']} flights into {len(stats['years'])} years "
+                  f"in {stats['seconds']:.2f}s")
+            print_index_stats(stats['indexes'])
+        list_partitions(conn)
+        return True
+
+    except Exception as e:
+        print(f"Error partitioning flights: {e}")
+        return False
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Range-partition the flights table by flight_date year")
+    parser.add_argument('--list', action='store_true',
+                        help="only list the existing partitions")
+    args = parser.parse_args()
+
+    if args.list:
+        conn = connect_to_db()
+        if not conn:
+            sys.exit(1)
+        list_partitions(conn)
+        conn.close()
+        sys.exit(0)
+
+    success = convert_flights()
+    sys.exit(0 if success else 1)
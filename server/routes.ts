@@ -1,6 +1,7 @@
 import type { Express } from "express";
 import { createServer, type Server } from "http";
 import { getStorage } from "./storage";
+import { sendFlightShard } from "./flightShards";
 import { insertFamilyMemberSchema, insertPostSchema, insertBlockSchema } from "@shared/schema";
 import { z } from "zod";
 
@@ -229,9 +230,18 @@ export async function registerRoutes(app: Express): Promise<Server> {
         const flights = await getStorage().getFlightsByDate(date as string);
         res.json(flights);
       } else if (month && year) {
-        const startDate = `${year}-${String(month).padStart(2, '0')}-01`;
-        const endDate = `${year}-${String(month).padStart(2, '0')}-31`;
-        const flights = await getStorage().getFlightsByDateRange(startDate, endDate);
+        const monthKey = `${year}-${String(month).padStart(2, '0')}`;
+        if (sendFlightShard(req, res, monthKey)) {
+          return;
+        }
+        const lastDay = new Date(Date.UTC(Number(year), Number(month), 0)).getUTCDate();
+        const flights = await getStorage().getFlightsByDateRange(`${monthKey}-01`, `${monthKey}-${lastDay}`);
+        res.json(flights);
+      } else if (year) {
+        if (sendFlightShard(req, res, String(year))) {
+          return;
+        }
+        const flights = await getStorage().getFlightsByDateRange(`${year}-01-01`, `${year}-12-31`);
         res.json(flights);
       } else {
         const flights = await getStorage().getFlights();
@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Synthetic logbook workbooks for import benchmarks.
+
+Generates sheets in the same layout as the exported logbook: the same
+header names including their leading spaces, seven trailing unnamed
+columns, a leading totals row without airports, durations as "HH:MM:SS"
+text or bare 0, the 747 model split across two cells, some missing
+destinations and distances. Routes use the reference airports so
+distance filling and airport resolution do real work. Columns are drawn
+with NumPy from a seeded generator, so a given size and seed always
+produces the same workbook; generated files are kept in DATA_DIR.
+"""
+import os
+from datetime import datetime, timedelta
+
+import numpy as np
+from openpyxl import Workbook
+
+from airport_reference import airport_index
+from great_circle import haversine_nm
+from logbook_clean import COLUMN_MAP
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.benchmark-data')
+
+# Only these two headers lack the leading space in the real export
+UNSPACED_HEADERS = {'flight_flightDate', 'flight_distance'}
+SHEET_HEADER = ([name if name in UNSPACED_HEADERS else ' ' + name for name in COLUMN_MAP]
+                + [None] * 7)
+
+FIRST_DATE = datetime(1996, 10, 1)
+LOGBOOK_YEARS = 30
+
+# aircraft_id, type, make, model, engine type, category, class, notes
+AIRCRAFT = [
+    ('ZSSAM', 'B742', 'BOEING COMPANY (USA)', '747-200 (E-4', ' VC-25)', 'Jet', 'Airplane', 'Multi-Engine Land'),
+    ('ZSSNA', 'A320', 'AIRBUS', 'A320-200', 'Jet', 'Airplane', 'Multi-Engine Land', None),
+    ('ZSSXA', 'A343', 'AIRBUS', 'A340-300', 'Jet', 'Airplane', 'Multi-Engine Land', None),
+    ('ZSSZA', 'B738', 'BOEING COMPANY (USA)', '737-800', 'Jet', 'Airplane', 'Multi-Engine Land', None),
+    ('ZSNAB', 'C172', 'CESSNA', '172 Skyhawk', 'Piston', 'Airplane', 'Single-Engine Land', None),
+    ('ZSPLC', 'PC12', 'PILATUS', 'PC-12', 'Turboprop', 'Airplane', 'Single-Engine Land', None),
+]
+
+CREW = [f"{first} {last}" for first in ('Steven', 'Anna', 'Pieter', 'Thandi', 'Johan', 'Lerato', 'Mark', 'Zanele')
+        for last in ('Mohaud', 'van Wyk', 'Naidoo', 'Botha', 'Dlamini')]
+
+def clock_text(minutes):
+    """Whole minutes as the sheet's "HH:MM:SS" text, or bare 0 for zero"""
+    return [f"{m // 60:02d}:{m % 60:02d}:00" if m else 0 for m in minutes.tolist()]
+
+def generate_columns(rows, seed=0):
+    """Column lists for rows flights, in SHEET_HEADER order (without the totals row)"""
+    rng = np.random.default_rng(seed)
+    index = airport_index()
+    codes = np.asarray(index.icao)
+
+    # Increasing dates spread over the logbook years
+    gaps = rng.exponential(LOGBOOK_YEARS * 365.0 / max(rows, 1), rows)
+    days = np.floor(np.cumsum(gaps)).astype(int)
+    dates = [FIRST_DATE + timedelta(days=day) for day in days.tolist()]
+
+    origin = rng.integers(0, len(codes), rows)
+    destination = (origin + rng.integers(1, len(codes), rows)) % len(codes)
+    distance = np.round(haversine_nm(index.latitude[origin], index.longitude[origin],
+                                     index.latitude[destination], index.longitude[destination]))
+    block = (distance / 7.5 + 25).astype(int)
+
+    from_codes = codes[origin].tolist()
+    to_codes = [None if missing else code for code, missing
+                in zip(codes[destination].tolist(), (rng.random(rows) < 0.01).tolist())]
+    distances = [None if missing else int(value) for value, missing
+                 in zip(distance.tolist(), (rng.random(rows) < 0.02).tolist())]
+
+    is_pic = rng.random(rows) < 0.4
+    night = np.where(rng.random(rows) < 0.3, (block * rng.random(rows)).astype(int), 0)
+    instrument = np.where(rng.random(rows) < 0.5, 20, 0)
+    departure = rng.integers(0, 1440, rows)
+    arrival = (departure + block) % 1440
+
+    crew = rng.integers(0, len(CREW), (rows, 2))
+    relief = rng.random(rows) < 0.1
+    aircraft = rng.integers(0, len(AIRCRAFT), rows)
+    flight_numbers = rng.integers(100, 1000, rows)
+
+    total = clock_text(block)
+    zeros = [0] * rows
+    crew_names = [CREW[i] for i in crew[:, 0].tolist()]
+    other_names = [CREW[i] for i in crew[:, 1].tolist()]
+
+    columns = [
+        dates,
+        [f"SA{number}" for number in flight_numbers.tolist()],
+        from_codes,
+        to_codes,
+        [name if pic else None for name, pic in zip(crew_names, is_pic.tolist())],
+        [None if pic else name for name, pic in zip(crew_names, is_pic.tolist())],
+        [name if r else None for name, r in zip(other_names, relief.tolist())],
+        [None] * rows,
+        clock_text(departure),
+        clock_text(arrival),
+        distances,
+        total,
+        [t if pic else 0 for t, pic in zip(total, is_pic.tolist())],
+        [0 if pic else t for t, pic in zip(total, is_pic.tolist())],
+        clock_text(night),
+        clock_text(instrument),
+        zeros, zeros, zeros,
+        [n if pic else 0 for n, pic in zip(clock_text(night), is_pic.tolist())],
+        [0 if pic else n for n, pic in zip(clock_text(night), is_pic.tolist())],
+        zeros,
+    ]
+    for field in range(len(AIRCRAFT[0])):
+        values = [entry[field] for entry in AIRCRAFT]
+        columns.append([values[i] for i in aircraft.tolist()])
+    return columns
+
+def totals_row(columns):
+    """The leading summary row the real export carries: a date and numbers, no airports"""
+    row = [None] * len(SHEET_HEADER)
+    row[0] = FIRST_DATE
+    row[10] = sum(value for value in columns[10] if value)
+    for i in (11, 12, 13, 14, 15):
+        row[i] = 0
+    return row
+
+def write_logbook(path, rows, seed=0):
+    """Write a synthetic logbook of rows flights (plus the totals row) to path"""
+    columns = generate_columns(rows, seed)
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet('Sheet1')
+    sheet.append(SHEET_HEADER)
+    sheet.append(totals_row(columns))
+    padding = (None,) * (len(SHEET_HEADER) - len(columns))
+    for row in zip(*columns):
+        sheet.append(row + padding)
+    tmp_path = path + '.tmp.xlsx'
+    workbook.save(tmp_path)
+    os.replace(tmp_path, path)
+    return path
+
+def synthetic_logbook(rows, seed=0, data_dir=DATA_DIR):
+    """Path of the synthetic logbook for rows and seed, generating it on first use"""
+    os.makedirs(data_dir, exist_ok=True)
+    path = os.path.join(data_dir, f"logbook_{rows}_{seed}.xlsx")
+    if not os.path.exists(path):
+        print(f"Generating synthetic logbook with {rows:,} rows...")
+        write_logbook(path, rows, seed)
+    return path
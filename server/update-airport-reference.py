@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Regenerate data/airports.csv from the airportsdata package and check it.
+
+airportsdata (pip install airportsdata) packages the OurAirports data
+with ICAO and IATA codes, names, cities, ISO countries and coordinates.
+Every airport already listed in the CSV is rewritten from it, so the
+file keeps its coverage while names, IATA codes and positions come from
+one authoritative source instead of being typed in by hand.
+
+Some logbook codes have since been retired; they are kept under their
+old code with the current airport's data and no IATA code, which stays
+with the current ICAO code.
+
+The check compares each route's logged distances in a logbook with the
+great circle between the reference coordinates. A route whose median
+logged distance disagrees points at a wrong airport position. Usage:
+
+    python update-airport-reference.py                  # regenerate, then check
+    python update-airport-reference.py --check          # only check the current CSV
+    python update-airport-reference.py --add FALE FAKN  # also list new airports
+"""
+import argparse
+import csv
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+from airport_reference import REFERENCE_CSV, airport_index
+from great_circle import distance_mismatches, route_distances
+from logbook_cache import load_clean_logbook
+
+try:
+    import airportsdata
+except ImportError:
+    airportsdata = None
+
+LOGBOOK_PATH = '../attached_assets/Logbook_All_TabV1_Cleaned_1750015246968.xlsx'
+
+FIELDS = ['icao', 'iata', 'name', 'city', 'country', 'latitude', 'longitude']
+
+# Retired ICAO code -> the code the same airport has now
+LEGACY_CODES = {
+    'FAJS': 'FAOR',  # Johannesburg International, now O. R. Tambo
+    'FLLS': 'FLKK',  # Lusaka International, now Kenneth Kaunda
+    'FMMM': 'FMMI',  # Antananarivo Ivato (FMMM is the FIR)
+    'OKBK': 'OKKK',  # Kuwait International
+}
+
+# ISO 3166 country code -> name stored in airports.country
+COUNTRY_NAMES = {
+    'AE': 'United Arab Emirates', 'AO': 'Angola', 'AR': 'Argentina', 'AT': 'Austria',
+    'AU': 'Australia', 'BR': 'Brazil', 'BW': 'Botswana', 'CD': 'DR Congo',
+    'CH': 'Switzerland', 'CI': "Côte d'Ivoire", 'CL': 'Chile', 'CN': 'China',
+    'CO': 'Colombia', 'CV': 'Cape Verde', 'DE': 'Germany', 'DK': 'Denmark',
+    'DZ': 'Algeria', 'EG': 'Egypt', 'ES': 'Spain', 'ET': 'Ethiopia',
+    'FR': 'France', 'GB': 'United Kingdom', 'GH': 'Ghana', 'HK': 'Hong Kong',
+    'IN': 'India', 'IT': 'Italy', 'JO': 'Jordan', 'JP': 'Japan',
+    'KE': 'Kenya', 'KW': 'Kuwait', 'LS': 'Lesotho', 'LY': 'Libya',
+    'MA': 'Morocco', 'MG': 'Madagascar', 'MU': 'Mauritius', 'MW': 'Malawi',
+    'MY': 'Malaysia', 'MZ': 'Mozambique', 'NA': 'Namibia', 'NG': 'Nigeria',
+    'NL': 'Netherlands', 'PE': 'Peru', 'QA': 'Qatar', 'RW': 'Rwanda',
+    'SA': 'Saudi Arabia', 'SG': 'Singapore', 'SN': 'Senegal', 'SZ': 'Eswatini',
+    'TH': 'Thailand', 'TN': 'Tunisia', 'TZ': 'Tanzania', 'UG': 'Uganda',
+    'US': 'United States', 'ZA': 'South Africa', 'ZM': 'Zambia', 'ZW': 'Zimbabwe',
+}
+
+def reference_row(airports, code):
+    """airports.csv row for an ICAO code from the airportsdata records"""
+    current = LEGACY_CODES.get(code, code)
+    airport = airports.get(current)
+    if airport is None:
+        raise Exception(f"{code} is not in airportsdata")
+    return {
+        'icao': code,
+        'iata': '' if current != code else airport['iata'],
+        'name': airport['name'],
+        'city': airport['city'],
+        'country': COUNTRY_NAMES.get(airport['country'], airport['country']),
+        'latitude': airport['lat'],
+        'longitude': airport['lon'],
+    }
+
+def regenerate_reference(extra_codes=(), path=REFERENCE_CSV):
+    """Rewrite the reference CSV from airportsdata, returning the number of airports"""
+    if airportsdata is None:
+        raise Exception("regenerating the reference needs the airportsdata package")
+    airports = airportsdata.load('ICAO')
+    with open(path, newline='', encoding='utf-8') as f:
+        codes = [row['icao'].strip().upper() for row in csv.DictReader(f)]
+    codes = sorted(set(codes) | {code.upper() for code in extra_codes})
+    rows = [reference_row(airports, code) for code in codes]
+    with open(path + '.tmp', 'w', newline='', encoding='utf-8') as f:
+        writer = csv.DictWriter(f, fieldnames=FIELDS)
+        writer.writeheader()
+        writer.writerows(rows)
+    os.replace(path + '.tmp', path)
+    return len(rows)
+
+def route_distance_check(flights, index=None):
+    """Routes whose median logged distance disagrees with the reference great circle
+
+    Returns a frame with one row per bad route (flights, logged and
+    great-circle nm); routes without a logged distance or coordinates
+    are not checked.
+    """
+    routes = pd.DataFrame({
+        'route': flights['from_airport'] + '-' + flights['to_airport'],
+        'logged': flights['distance'].to_numpy(dtype=np.float64, na_value=np.nan),
+        'computed': route_distances(flights['from_airport'].to_numpy(),
+                                    flights['to_airport'].to_numpy(), index),
+    }).groupby('route').agg(flights=('logged', 'size'), logged=('logged', 'median'),
+                            computed=('computed', 'first'))
+    return routes[distance_mismatches(routes['logged'], routes['computed'])]
+
+def check_reference(logbook_path):
+    """Print the routes failing the distance check, returning True when there are none"""
+    flights, _, _ = load_clean_logbook(logbook_path)
+    bad = route_distance_check(flights)
+    routes = (flights['from_airport'] + '-' + flights['to_airport']).nunique()
+    print(f"Checked {routes} routes against {len(airport_index())} reference airports")
+    for route, row in bad.sort_values('flights', ascending=False).iterrows():
+        print(f"  {route} ({row['flights']} flights): logged {row['logged']:.0f} nm, "
+              f"great circle {row['computed']:.0f} nm")
+    if len(bad):
+        print(f"{len(bad)} routes disagree with the reference coordinates")
+    return len(bad) == 0
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Regenerate and check the airport reference data")
+    parser.add_argument('--check', action='store_true',
+                        help="only check the current reference against the logbook")
+    parser.add_argument('--add', nargs='+', default=[], metavar='ICAO',
+                        help="airports to add to the reference")
+    parser.add_argument('--logbook', default=LOGBOOK_PATH,
+                        help="logbook whose logged distances the reference is checked against")
+    args = parser.parse_args()
+
+    try:
+        if not args.check:
+            print(f"Wrote {regenerate_reference(args.add)} airports to {REFERENCE_CSV}")
+        success = check_reference(args.logbook)
+    except Exception as e:
+        print(f"Error updating the airport reference: {e}")
+        success = False
+    sys.exit(0 if success else 1)
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Dry-run validation of a logbook before importing it.
+
+Cleans the workbook exactly as the importers do (through the logbook
+cache), runs the checks in logbook_validation without touching the
+database and writes every finding to a rejects CSV. Exits non-zero when
+any error-level finding is present, so it can gate an import. Usage:
+
+    python validate-logbook.py
+    python validate-logbook.py ../attached_assets/logbooks/2024.xlsx --report rejects.csv
+    python validate-logbook.py --checks duplicate overlap
+"""
+import argparse
+import sys
+
+from logbook_cache import clear_cache, load_clean_logbook
+from logbook_validation import CHECKS, print_validation_summary, validate_logbook
+
+LOGBOOK_PATH = '../attached_assets/Logbook_All_TabV1_Cleaned_1750015246968.xlsx'
+
+def validate(path, report_path, checks=None, use_cache=True):
+    """Validate one logbook and write its rejects report, returning the error count"""
+    flights, skipped, rows = load_clean_logbook(path, use_cache=use_cache)
+    print(f"Read {rows} logbook rows, {len(flights)} flights after cleaning")
+
+    rejects = validate_logbook(flights, checks)
+    print_validation_summary(rejects, flights)
+    rejects.to_csv(report_path, index=False)
+    print(f"Rejects report written to {report_path}")
+    return int((rejects['severity'] == 'error').sum())
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Check a logbook for duplicates, overlaps and chain breaks")
+    parser.add_argument('path', nargs='?', default=LOGBOOK_PATH,
+                        help="logbook workbook (default: the attached logbook)")
+    parser.add_argument('--report', default='logbook_rejects.csv',
+                        help="where to write the rejects CSV (default: %(default)s)")
+    parser.add_argument('--checks', nargs='+', choices=list(CHECKS),
+                        help="checks to run (default: all)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always re-parse the workbook instead of using the logbook cache")
+    parser.add_argument('--clear-cache', action='store_true',
+                        help="delete every cached logbook first, e.g. to reclaim disk space")
+    args = parser.parse_args()
+
+    if args.clear_cache:
+        print(f"Cleared {clear_cache()} logbook cache files")
+    errors = validate(args.path, args.report, args.checks, use_cache=not args.no_cache)
+    sys.exit(1 if errors else 0)
@@ -1,4 +1,4 @@
-import { pgTable, text, serial, integer, boolean, timestamp, date, real } from "drizzle-orm/pg-core";
+import { pgTable, text, serial, integer, boolean, timestamp, date, real, doublePrecision, unique, index } from "drizzle-orm/pg-core";
 import { createInsertSchema } from "drizzle-zod";
 import { relations } from "drizzle-orm";
 import { z } from "zod";
@@ -43,6 +43,8 @@ export const blocks = pgTable("blocks", {
   pageId: text("page_id").notNull(), // home, family, posts, etc.
 });
 
+// server/partition-flights.py can range-partition this table by flight_date year;
+// its primary key is then (id, flight_date)
 export const flights = pgTable("flights", {
   id: serial("id").primaryKey(),
   flightDate: date("flight_date").notNull(),
@@ -74,8 +76,24 @@ export const flights = pgTable("flights", {
   engineType: text("engine_type"),
   category: text("category"),
   aircraftClass: text("aircraft_class"),
-  notes: text("notes")
-});
+  notes: text("notes"),
+  // Whole-minute values parsed from the duration text columns at import time
+  totalTimeMinutes: integer("total_time_minutes"),
+  picMinutes: integer("pic_minutes"),
+  sicMinutes: integer("sic_minutes"),
+  nightMinutes: integer("night_minutes"),
+  actualInstrumentMinutes: integer("actual_instrument_minutes"),
+  simulatorMinutes: integer("simulator_minutes"),
+  picNightMinutes: integer("pic_night_minutes"),
+  sicNightMinutes: integer("sic_night_minutes"),
+  rowKey: text("row_key"), // natural-key hash maintained by the incremental importer
+  rowHash: text("row_hash") // content hash maintained by the incremental importer
+}, (table) => [
+  // Built after bulk loads by server/flight_indexes.py under the same names
+  index("flights_flight_date_idx").on(table.flightDate),
+  index("flights_from_airport_idx").on(table.from),
+  index("flights_to_airport_idx").on(table.to),
+]);
 
 export const airports = pgTable("airports", {
   id: serial("id").primaryKey(),
@@ -87,6 +105,41 @@ export const airports = pgTable("airports", {
   longitude: real("longitude")
 });
 
+// Per-dimension flight totals maintained by the Python import pipeline
+export const flightStats = pgTable("flight_stats", {
+  id: serial("id").primaryKey(),
+  dimension: text("dimension").notNull(), // year, month, aircraft_type, route, airport, crew
+  key: text("key").notNull(),
+  flights: integer("flights").notNull(),
+  totalMinutes: integer("total_minutes"),
+  picMinutes: integer("pic_minutes"),
+  sicMinutes: integer("sic_minutes"),
+  nightMinutes: integer("night_minutes"),
+  instrumentMinutes: integer("instrument_minutes"),
+  simulatorMinutes: integer("simulator_minutes"),
+  distance: doublePrecision("distance"),
+  firstFlight: date("first_flight"),
+  lastFlight: date("last_flight"),
+  refreshedAt: timestamp("refreshed_at").defaultNow().notNull(),
+}, (table) => [
+  unique().on(table.dimension, table.key),
+]);
+
+// Deduplicated airport-pair routes with precomputed great-circle paths for the map
+export const flightRoutes = pgTable("flight_routes", {
+  id: serial("id").primaryKey(),
+  from: text("from_airport").notNull(),
+  to: text("to_airport").notNull(),
+  flights: integer("flights").notNull(),
+  firstFlown: date("first_flown"),
+  lastFlown: date("last_flown"),
+  totalMinutes: integer("total_minutes"),
+  distance: doublePrecision("distance"),
+  path: text("path"), // JSON array of [lat, lng] points
+}, (table) => [
+  unique().on(table.from, table.to),
+]);
+
 export const insertUserSchema = createInsertSchema(users).pick({
   username: true,
   password: true,
@@ -127,6 +180,9 @@ export type Block = typeof blocks.$inferSelect;
 export type InsertFlight = z.infer<typeof insertFlightSchema>;
 export type Flight = typeof flights.$inferSelect;
 
+export type FlightStat = typeof flightStats.$inferSelect;
+export type FlightRoute = typeof flightRoutes.$inferSelect;
+
 export type InsertAirport = z.infer<typeof insertAirportSchema>;
 export type Airport = typeof airports.$inferSelect;
 
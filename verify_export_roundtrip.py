@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Wolf's Lair Family Platform - Export/Restore Round-Trip Check
+Exports the database (DATABASE_URL) in every directory format, restores
+each export into a scratch database and compares every table's row count
+and content checksum with the source. The delta check restores a binary
+export and then applies a fresh delta chain from the start on top of it,
+the documented restore_database.py --deltas --since 0 flow.
+
+The scratch database needs the same schema (npm run db:push, plus
+server/partition-flights.py if the source flights table is partitioned)
+and its tables are TRUNCATEd by every restore, so never point --target at
+real data. Run it against a quiet source: the source checksums are taken
+outside the export snapshot.
+
+Usage:
+    python verify_export_roundtrip.py --target postgresql://localhost/wolfslair_scratch
+"""
+
+import os
+import sys
+import argparse
+import tempfile
+
+import psycopg2
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'server'))
+from database import Connection, connect, database_dsn
+from flight_partitions import is_partitioned, year_partitions
+from export_complete_database import DELTA_DIR, export_delta, export_parallel, list_tables
+from restore_database import apply_deltas, read_manifest, restore_binary_export, restore_sql_dump
+
+FORMATS = ['sql', 'binary', 'delta']
+
+def table_checksums(conn):
+    """Row count and ordered content md5 of every exported table"""
+    cursor = conn.cursor()
+    checksums = {}
+    for table in list_tables(cursor):
+        cursor.execute(f"SELECT COUNT(*), md5(string_agg(md5(t::text), '' ORDER BY id)) FROM {table} t")
+        checksums[table] = cursor.fetchone()
+    conn.rollback()
+    cursor.close()
+    return checksums
+
+def restore_export(conn, export_dir):
+    """Restore a directory export the way restore_database.py does"""
+    manifest = read_manifest(export_dir)
+    if manifest['format'] == 'binary':
+        restore_binary_export(conn, export_dir, manifest)
+    else:
+        restore_sql_dump(conn, [os.path.join(export_dir, entry['file']) for entry in manifest['tables']],
+                         [entry['table'] for entry in manifest['tables']])
+    return manifest
+
+def compare_checksums(expected, actual):
+    """Mismatch descriptions between source and restored checksums"""
+    problems = []
+    for table, (rows, checksum) in expected.items():
+        if table not in actual:
+            problems.append(f"{table}: missing from the restored database")
+        elif actual[table] != (rows, checksum):
+            problems.append(f"{table}: {rows:,} source records, {actual[table][0]:,} restored "
+                            f"(checksum {'matches' if actual[table][1] == checksum else 'differs'})")
+    return problems
+
+def check_format(source_tables, expected, target, fmt, workers):
+    """Export in one format, restore into target and compare, returning the problems found"""
+    with tempfile.TemporaryDirectory(prefix=f"roundtrip_{fmt}_") as export_dir:
+        export_parallel(workers, export_dir, 'binary' if fmt == 'delta' else fmt)
+        manifest = read_manifest(export_dir)
+        problems = [f"{entry['table']}: exported but not a restorable table"
+                    for entry in manifest['tables'] if entry['table'] not in source_tables]
+        restore_export(target, export_dir)
+        if fmt == 'delta':
+            export_delta(export_dir)
+            apply_deltas(target, os.path.join(export_dir, DELTA_DIR))
+    return problems + compare_checksums(expected, table_checksums(target))
+
+def main():
+    parser = argparse.ArgumentParser(description="Check that exports restore to identical data")
+    parser.add_argument('--target', required=True,
+                        help="connection URL of a scratch database with the same schema")
+    parser.add_argument('--format', choices=FORMATS, action='append',
+                        help="export format to check (default: all)")
+    parser.add_argument('--workers', type=int, default=2,
+                        help="parallel export workers")
+    args = parser.parse_args()
+
+    if args.target == database_dsn():
+        parser.error("--target must be a scratch database, not DATABASE_URL")
+
+    try:
+        source = connect()
+        cursor = source.cursor()
+        source_tables = set(list_tables(cursor))
+        if is_partitioned(cursor):
+            print(f"flights is partitioned into {len(year_partitions(cursor))} years")
+        else:
+            print("flights is not partitioned; run server/partition-flights.py first to check partitioned exports")
+        cursor.close()
+        expected = table_checksums(source)
+        source.close()
+
+        target = psycopg2.connect(args.target, connection_factory=Connection)
+        failures = 0
+        try:
+            for fmt in args.format or FORMATS:
+                print(f"\nChecking {fmt} export round trip")
+                problems = check_format(source_tables, expected, target, fmt, args.workers)
+                for problem in problems:
+                    print(f"  ✗ {problem}")
+                if problems:
+                    failures += 1
+                else:
+                    print(f"✓ {fmt} export restored {len(expected)} tables identically")
+        finally:
+            target.close()
+
+        if failures:
+            print(f"\n❌ {failures} export formats did not round-trip")
+            return 1
+        print("\n✅ Every export format round-trips")
+        return 0
+
+    except Exception as e:
+        print(f"❌ Round-trip check failed: {e}")
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())